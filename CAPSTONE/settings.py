@@ -84,6 +84,35 @@ DATABASES = {
     }
 }
 
+# Shared caches (Redis; `pip install redis`). Every worker and management
+# command must see the same ones:
+#   default  -> payloads: week grids, attendance previews, reader last-seen
+#   versions -> the change counters the in-process indexes (RFID cards,
+#               readers, timetables, ...) check; atomic INCR, kept in their
+#               own Redis DB and never expiring
+# Run Redis with maxmemory-policy volatile-lru (or noeviction) so counters,
+# which have no TTL, are never evicted. Don't use the per-process
+# LocMemCache with more than one worker.
+REDIS_URL = os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379')
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': f'{REDIS_URL}/0',
+        'KEY_PREFIX': 'smartlab',
+        'TIMEOUT': 300,
+    },
+    'versions': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': f'{REDIS_URL}/1',
+        'KEY_PREFIX': 'smartlab',
+        'TIMEOUT': None,
+    },
+}
+
+# change counters are re-read from the "versions" cache at most every N
+# seconds per process; in between, taps and 304s answer from memory
+VERSION_CHECK_SECONDS = 1
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -140,6 +169,132 @@ SSRS_NTLM_USER = "SEAN\\reportuser"
 SSRS_NTLM_PASS = "StrongPassword123!"
 SSRS_VERIFY_TLS = False
 
+# per report: "ssrs" (report server), "local" (Django template + WeasyPrint),
+# or "auto" (report server, local when SSRS fails)
+REPORT_RENDERERS = {
+    SSRS_UTILIZATION_REPORT_PATH: "ssrs",
+    SSRS_ATTENDANCE_REPORT_PATH: "ssrs",
+}
+
+# bulk print/export: render threads (shared), and max in-flight per report server
+SSRS_RENDER_WORKERS = 4
+SSRS_MAX_PER_HOST = 4
+
+# keep-alive SSRS session per thread (connections kept, seconds idle before rebuild)
+SSRS_POOL_SIZE = 4
+SSRS_SESSION_IDLE_TIMEOUT = 120
+
+# SSRS resilience: per-try timeout and total budget (s), retries on 5xx with
+# jittered backoff (base s), breaker opens after N failures in a row for
+# COOLDOWN s, hedge a second request past this latency percentile (0 = off)
+SSRS_TIMEOUT = 30
+SSRS_DEADLINE = 45
+SSRS_RETRIES = 2
+SSRS_RETRY_BACKOFF = 0.5
+SSRS_BREAKER_THRESHOLD = 5
+SSRS_BREAKER_COOLDOWN = 30
+# hedging is off: a duplicate render doubles SSRS load for that report. To enable, set a
+# percentile such as 95 once the report server has headroom (needs 20 latency samples per report)
+SSRS_HEDGE_PERCENTILE = 0
+SSRS_LATENCY_SAMPLES = 200
+
+# rendered PDFs of Completed slips (defaults to MEDIA_ROOT/report_cache), LRU-trimmed to this size
+REPORT_CACHE_DIR = MEDIA_ROOT / 'report_cache'
+REPORT_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+# pre-render both reports into the cache when a session completes
+# (seconds after completion, retries, base backoff seconds)
+REPORT_PRERENDER = True
+REPORT_PRERENDER_DELAY = 5
+REPORT_PRERENDER_ATTEMPTS = 5
+REPORT_PRERENDER_BACKOFF = 30
+
+# background exports (dashboard): folder, job threads, per-report retries, how long results are kept,
+# and how long a queued/running job may go without its process's heartbeat before it counts as failed
+EXPORT_JOBS_DIR = BASE_DIR / 'export_jobs'
+EXPORT_JOB_WORKERS = 1
+EXPORT_JOB_RETRIES = 2
+EXPORT_JOB_TTL_HOURS = 24
+EXPORT_JOB_STALE_SECONDS = 300
+
+# merged PDF exports keep up to this many bytes in memory, then spool to temp files
+EXPORT_SPOOL_BYTES = 16 * 1024 * 1024
+# merging holds every page in memory, so selections past this many reports come back as a ZIP instead
+EXPORT_MERGE_MAX_REPORTS = 200
+
+# dashboard preview modal: cached JSON for Completed slips (seconds), ids per batch call
+ATTENDANCE_PREVIEW_TTL = 3600
+ATTENDANCE_PREVIEW_BATCH_MAX = 100
+
+# RFID readers count as offline after this many seconds without a tap or heartbeat;
+# each worker shares a reader's last-seen at most every N seconds
+READER_OFFLINE_SECONDS = 300
+READER_SEEN_WRITE_SECONDS = 30
+
+# complete overdue Active sessions every N seconds: "thread" runs in-process,
+# "command" leaves it to `python manage.py sweep_sessions --loop` (shared CACHES only)
+SESSION_SWEEPER = "thread"
+SESSION_SWEEP_SECONDS = 30
+
+# batch check-in: taps per request, oldest client timestamp accepted (hours)
+RFID_BATCH_MAX = 200
+RFID_BATCH_MAX_AGE_HOURS = 12
+
+# repeat reads of one card on one reader within N seconds get the first
+# read's result; Idempotency-Key replays are remembered for N seconds
+RFID_DEDUP_SECONDS = 3
+RFID_IDEMPOTENCY_SECONDS = 600
+
+# tap timing: taps kept per stage/lab for percentiles; log taps slower than
+# this many ms (0 = never)
+RFID_TIMING_SAMPLES = 500
+RFID_SLOW_TAP_MS = 500
+
+# async check-in (rfid/check-in/async/ under ASGI): DB threads shared by all
+# taps in the process
+RFID_DB_WORKERS = 8
+
+# realtime outbox: wait this long after the first queued event so a burst
+# goes out as one Pusher batch
+REALTIME_LINGER_MS = 50
+
+# live event streams (SSE): ASGI only (uvicorn/daphne CAPSTONE.asgi), leave
+# off under runserver/WSGI; idle check / keep-alive every N seconds, how
+# long one stream stays open before the browser reconnects, and the slow
+# poll pages keep running next to a stream
+SSE_ENABLED = False
+SSE_SAFETY_POLL_SECONDS = 60
+SSE_CHECK_SECONDS = 5
+SSE_MAX_SECONDS = 300
+
+# schema registry (optional tables/columns): re-read INFORMATION_SCHEMA at
+# least every N seconds; `manage.py refresh_schema` forces it sooner
+SCHEMA_REGISTRY_MAX_AGE = 600
+
+# active-session snapshot per lab: re-read at least every N seconds even
+# when no change version moved
+ACTIVE_SESSIONS_MAX_AGE = 15
+
+# polled JSON (active sessions, dashboard, week grids) answers 304 while its
+# change versions hold; tags also roll over every N seconds
+ETAG_MAX_AGE_SECONDS = 300
+
+# built week grids (schedule pages) stay cached at most this long; writes
+# to a lab's week drop them sooner. Each process also keeps the grids it
+# served for WEEK_GRID_LOCAL_SECONDS (same versions), skipping Redis.
+WEEK_GRID_TTL = 600
+WEEK_GRID_LOCAL_SECONDS = 30
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {
+        "core": {"handlers": ["console"], "level": "INFO"},
+        "teacher": {"handlers": ["console"], "level": "INFO"},
+    },
+}
+
 
 PUSHER_APP_ID = "2080588"
 PUSHER_KEY = "d6725d162a2e3ab1624b"
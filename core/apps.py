@@ -4,3 +4,16 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from django.core.signals import request_started
+
+        # load the RFID index and start the session sweeper on the first
+        # request (not in ready(), so migrate/shell don't spin up threads)
+        def _on_first_request(**kwargs):
+            request_started.disconnect(_on_first_request, dispatch_uid="core.first_request")
+            from .utils import rfid_index, sweeper
+            rfid_index.warm()
+            sweeper.start()
+
+        request_started.connect(_on_first_request, dispatch_uid="core.first_request", weak=False)
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from django.conf import settings
+
+from core.utils import schema, versions
+
+
+class Command(BaseCommand):
+    help = "Re-read tables/columns into the schema capability registry (run after migrations)."
+
+    def handle(self, *args, **opts):
+        cols = schema.refresh()
+        total = sum(len(c) for c in cols.values())
+        self.stdout.write(self.style.SUCCESS(f"Schema registry refreshed: {len(cols)} tables, {total} columns."))
+        if not versions.shared():
+            max_age = int(getattr(settings, "SCHEMA_REGISTRY_MAX_AGE", 600))
+            self.stdout.write(self.style.WARNING(
+                f"CACHES is per process: running servers pick this up within {max_age}s or on restart."))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.utils import sweeper, versions
+
+
+class Command(BaseCommand):
+    help = "Complete overdue Active sessions (once, or every SESSION_SWEEP_SECONDS with --loop)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true",
+                            help="Keep running; use with SESSION_SWEEPER = 'command'.")
+
+    def handle(self, *args, **opts):
+        if not versions.shared():
+            # completions are announced through cache versions the web workers can't see
+            if opts["loop"]:
+                raise CommandError("--loop needs a shared cache (settings.CACHES); "
+                                   "with a per-process cache use SESSION_SWEEPER = 'thread'.")
+            self.stdout.write(self.style.WARNING(
+                "CACHES is per process: running servers won't see these completions until their caches expire."))
+
+        if opts["loop"]:
+            self.stdout.write("Sweeping overdue sessions (Ctrl+C to stop)...")
+            try:
+                sweeper.run_forever()
+            except KeyboardInterrupt:
+                pass
+            return
+
+        done = sweeper.sweep()
+        self.stdout.write(self.style.SUCCESS(f"Completed {len(done)} session(s)."))
@@ -19,7 +19,12 @@ urlpatterns = [
     path('dashboard/print-queue-single/', views.print_queue_single, name='print_queue_single'),
     path('dashboard/export-merged-pdf/', views.export_merged_pdf, name='export_merged_pdf'),
     path('dashboard/export-pdfs/', views.export_pdfs, name='export_pdfs'),
+    path('dashboard/export-jobs/', views.export_job_submit, name='export_job_submit'),
+    path('dashboard/export-jobs/<str:job_id>/', views.export_job_status, name='export_job_status'),
+    path('dashboard/export-jobs/<str:job_id>/download/', views.export_job_download, name='export_job_download'),
+    path('dashboard/ssrs-stats/', views.ssrs_stats, name='ssrs_stats'),
     path('api/attendance-preview/', views.attendance_preview_api, name='attendance_preview_api'),
+    path('api/attendance-preview/batch/', views.attendance_preview_batch_api, name='attendance_preview_batch_api'),
 
 
     # Courses
@@ -97,7 +102,10 @@ urlpatterns = [
     # Schedule
      path('manage-schedule/', views.manage_schedule, name='manage_schedule'),
     path('admin-week-data/', views.admin_week_data, name='admin_week_data'),
+    path('campus-overview/', views.campus_overview, name='campus_overview'),
+    path('campus-week-data/', views.admin_campus_week_data, name='admin_campus_week_data'),
     path('get-active-sessions/', views.get_active_sessions, name='get_active_sessions'),
+    path('live/lab/<int:lab_id>/', views.lab_live_stream, name='lab_live_stream'),
     path('admin-create-schedule/', views.admin_create_schedule, name='admin_create_schedule'),
 # admin urls.py
     path("approve_reservation/<int:slip_id>/", views.approve_reservation, name="admin_approve_reservation"),
@@ -118,6 +126,11 @@ urlpatterns = [
     path('rfid-scan/', views.rfid_scan, name='rfid_scan'),
     path('scan-page/', views.rfid_scan_page, name='scan_rfid_page'),
     path('rfid/check-in/', views.rfid_check_in, name='rfid_check_in'),
+    path('rfid/check-in/async/', views.rfid_check_in_async, name='rfid_check_in_async'),
+    path('rfid/check-in/batch/', views.rfid_check_in_batch, name='rfid_check_in_batch'),
+    path('rfid/heartbeat/', views.rfid_heartbeat, name='rfid_heartbeat'),
+    path('dashboard/readers/status/', views.rfid_reader_status, name='rfid_reader_status'),
+    path('dashboard/readers/timing/', views.rfid_tap_timing, name='rfid_tap_timing'),
     path('rfid-listen/', views.rfid_test_page, name='rfid_listen'),
     path('rfid/test/', views.rfid_test_page, name='rfid_test_page'),
 
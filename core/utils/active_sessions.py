@@ -0,0 +1,70 @@
+# core/utils/active_sessions.py
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from . import timetable
+
+
+# =========================
+# Active-session snapshot per lab
+# =========================
+# Today's 'Active' slips for a lab, as the grids and the lab-<id> Pusher
+# channel show them. Held in this process and re-read only when the lab's
+# timetable version moves, which every check-in, tap-out and sweeper
+# completion bumps (timetable.lab_changed), through the shared cache.
+# ACTIVE_SESSIONS_MAX_AGE also bounds how long a copy is served, whatever
+# the version says. Reads only today's rows, and polling never writes:
+# overdue slips are left to the sweeper.
+
+_lock = threading.Lock()
+_labs = {}   # lab_id -> (version, date, loaded_at, sessions)
+
+
+def _max_age():
+    return float(getattr(settings, "ACTIVE_SESSIONS_MAX_AGE", 15))
+
+
+def _query(cursor, lab_id, day):
+    cursor.execute("""
+        SELECT date, start_time, end_time, requested_by, schedule_id
+          FROM UTILIZATION_SLIP
+         WHERE lab_id = %s AND status = 'Active' AND date = %s
+         ORDER BY start_time
+    """, [lab_id, day])
+    return [
+        {
+            "date":        d.isoformat(),
+            "start_time":  st.strftime("%H:%M:%S") if st else None,
+            "end_time":    et.strftime("%H:%M:%S") if et else None,
+            "faculty_id":  fid,
+            "schedule_id": sid,
+        }
+        for d, st, et, fid, sid in cursor.fetchall()
+    ]
+
+
+def sessions(lab_id):
+    """Today's active sessions for lab_id: [{date, start_time, end_time, faculty_id, schedule_id}]."""
+    lab_id = int(lab_id)
+    day = timezone.localdate()
+    ver = timetable.version(lab_id)
+    with _lock:
+        hit = _labs.get(lab_id)
+    now = time.monotonic()
+    if hit is not None and hit[0] == ver and hit[1] == day and now - hit[2] < _max_age():
+        return hit[3]
+
+    with connection.cursor() as cursor:
+        rows = _query(cursor, lab_id, day)
+    with _lock:
+        _labs[lab_id] = (ver, day, now, rows)
+    return rows
+
+
+def fresh(cursor, lab_id):
+    """Re-read on the writer's cursor, so a push right after a write sees it (not cached)."""
+    return _query(cursor, lab_id, timezone.localdate())
@@ -0,0 +1,142 @@
+# core/utils/attendance_previews.py
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from . import versions
+
+
+# =========================
+# Attendance preview cache (dashboard modal)
+# =========================
+# Only Completed slips are cached. Keys carry two shared counters (see
+# versions), read from memory or in one go, so a cached preview costs no
+# query:
+#   changed(ids)     -> a slip's row or its attendance changed (slip
+#                       completion; any later edit of a Completed slip)
+#   invalidate_all() -> a student/teacher edit that can show up in any
+#                       preview; bumps the generation so old keys go unused
+# ATTENDANCE_PREVIEW_TTL bounds anything else (lab/course renames).
+
+_GEN_KEY = "attendance_preview:gen"
+
+
+def _slip_key(uid):
+    return f"attendance_preview:slip:{uid}"
+
+
+def _ttl():
+    return int(getattr(settings, "ATTENDANCE_PREVIEW_TTL", 3600))
+
+
+def _key(uid, gen, version):
+    return f"attendance_preview:{gen}:{uid}:{version}"
+
+
+def changed(utilization_ids):
+    """Call after writing a slip or its attendance rows (on commit)."""
+    keys = [_slip_key(int(u)) for u in utilization_ids if u]
+    if keys:
+        transaction.on_commit(lambda: [versions.bump(k) for k in keys])
+
+
+def invalidate_all():
+    versions.bump(_GEN_KEY)
+
+
+def _time_label(v):
+    from core.views import _normalize_time_label  # views import this module; resolve lazily
+    return _normalize_time_label(v)
+
+
+def _build(ids):
+    """Preview dicts for ids (3 queries per 500 ids) + the set that are Completed."""
+    rows, students, names = {}, {}, {}
+    with connection.cursor() as cursor:
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            marks = ",".join(["%s"] * len(chunk))
+            cursor.execute(f"""
+                SELECT u.utilization_id, u.status,
+                       u.date, u.time_duration, l.lab_num,
+                       CONCAT(f.first_name,' ',f.last_name) AS instructor,
+                       c.course_code, u.student_year_and_section,
+                       COALESCE(u.remarks,'') AS remarks,
+                       u.processed_by,
+                       s.term, s.school_year
+                FROM UTILIZATION_SLIP u
+                JOIN LABORATORIES l ON u.lab_id = l.lab_id
+                JOIN LAB_SCHEDULE ls ON u.schedule_id = ls.schedule_id
+                JOIN ASSIGNED_TEACHER at ON ls.assigned_teacher_id = at.assigned_teacher_id
+                JOIN COURSE c ON at.course_id = c.course_id
+                JOIN FACULTY f ON u.requested_by = f.faculty_id AND f.is_archived = 0
+                JOIN SEMESTER s ON at.semester_id = s.semester_id
+                WHERE u.utilization_id IN ({marks})
+            """, chunk)
+            for r in cursor.fetchall():
+                rows[r[0]] = r
+
+            cursor.execute(f"""
+                SELECT a.utilization_id,
+                       CONCAT(s.first_name, ' ',
+                              COALESCE(LEFT(s.middle_name,1)+'. ',''),
+                              s.last_name) AS full_name
+                FROM COMPUTER_LAB_ATTENDANCE a
+                JOIN STUDENTS s ON a.student_id = s.student_id
+                WHERE a.utilization_id IN ({marks}) AND s.is_archived = 0
+                ORDER BY a.utilization_id, full_name
+            """, chunk)
+            for uid, name in cursor.fetchall():
+                students.setdefault(uid, []).append(name)
+
+        processors = sorted({r[9] for r in rows.values() if r[9]})
+        for start in range(0, len(processors), 500):
+            chunk = processors[start:start + 500]
+            marks = ",".join(["%s"] * len(chunk))
+            cursor.execute(f"""
+                SELECT faculty_id, CONCAT(first_name,' ',last_name)
+                FROM FACULTY WHERE faculty_id IN ({marks}) AND is_archived=0
+            """, chunk)
+            names.update(cursor.fetchall())
+
+    out, completed = {}, set()
+    for uid, r in rows.items():
+        names_in = students.get(uid, [])
+        out[uid] = {
+            "date": str(r[2]),
+            "time": _time_label(r[3]),
+            "lab": r[4],
+            "instructor": r[5],
+            "course": r[6],
+            "section": r[7],
+            "remarks": r[8],
+            "processed_by": names.get(r[9], "") if r[9] else "",
+            "semester": f"{r[10]}, A.Y. {r[11]}",
+            "students_present": len(names_in),
+            "students": names_in,
+        }
+        if (r[1] or "").strip().upper() == "COMPLETED":
+            completed.add(uid)
+    return out, completed
+
+
+def get_many(utilization_ids):
+    """{utilization_id: preview} for the ids that exist; cache first, one batch for the rest."""
+    ids = list(dict.fromkeys(int(u) for u in utilization_ids))
+    if not ids:
+        return {}
+    gen, *slip_vers = versions.current_many([_GEN_KEY] + [_slip_key(uid) for uid in ids])
+    keys = {_key(uid, gen, ver): uid for uid, ver in zip(ids, slip_vers)}
+    out = {keys[k]: v for k, v in cache.get_many(list(keys)).items()}
+
+    missing = [uid for uid in ids if uid not in out]
+    if missing:
+        built, completed = _build(missing)
+        by_uid = {uid: k for k, uid in keys.items()}
+        cache.set_many({by_uid[uid]: built[uid] for uid in completed}, _ttl())
+        out.update(built)
+    return out
+
+
+def get(utilization_id):
+    return get_many([utilization_id]).get(int(utilization_id))
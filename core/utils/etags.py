@@ -0,0 +1,67 @@
+# core/utils/etags.py
+import hashlib
+import time
+from datetime import datetime
+
+from django.conf import settings
+
+from . import live, rfid_index, timetable, versions, week_grid
+
+
+# =========================
+# Change-version ETags for polled JSON
+# =========================
+# The polled endpoints tag their payload with the versions that move when
+# its rows do: a lab's schedules/slips (timetable.lab_changed, bumped on
+# every slip, schedule and request write), a lab's week grid (week_grid)
+# and a teacher's session and attendance (the live stream events). Used with Django's @etag decorator,
+# a poll whose If-None-Match still matches gets a 304 before the view
+# touches the DB. ETAG_MAX_AGE_SECONDS rolls every tag now and then, for
+# edits nothing bumps (course or lab renames). A tag's versions come from
+# one versions.current_many() call, which answers from this process's copy
+# (VERSION_CHECK_SECONDS) and otherwise makes a single Redis read, so a 304
+# never touches the database. With a per-process cache the versions differ
+# per worker, so no tag is sent at all (always a full 200).
+
+def _tag(*parts):
+    if not versions.shared():
+        return None
+    max_age = int(getattr(settings, "ETAG_MAX_AGE_SECONDS", 300))
+    bucket = int(time.time() // max_age) if max_age > 0 else 0
+    raw = "|".join(str(p) for p in parts + (bucket,))
+    return hashlib.sha1(raw.encode()).hexdigest()[:24]
+
+
+def lab_tag(lab_id, *extra):
+    """ETag for a view of one lab's schedules/slips; extra = the request's own params."""
+    if not str(lab_id or "").isdigit():
+        return None
+    return _tag("lab", lab_id, *timetable.version(lab_id), *extra)
+
+
+def week_tag(lab_id, week_str, default_day, *extra):
+    """ETag for a week grid: moves only when that lab's week (or every grid) changes."""
+    if not str(lab_id or "").isdigit():
+        return None
+    try:
+        day = datetime.strptime(week_str, "%Y-%m-%d").date() if week_str else default_day
+    except ValueError:
+        day = default_day
+    return _tag("week", lab_id, day, *week_grid.version(lab_id, day), *extra)
+
+
+def campus_week_tag(week_str, default_day):
+    """ETag for the every-lab week grid of the week containing week_str."""
+    try:
+        day = datetime.strptime(week_str, "%Y-%m-%d").date() if week_str else default_day
+    except ValueError:
+        day = default_day
+    return _tag("campus", day, *week_grid.campus_version(day))
+
+
+def teacher_tag(teacher_id, *extra):
+    """ETag for a teacher's own session view (their slips, its attendance, names)."""
+    if not teacher_id:
+        return None
+    keys = [live.version_key(f"teacher-{teacher_id}"), rfid_index.version_key(), *timetable.version_keys(None)]
+    return _tag("teacher", teacher_id, *versions.current_many(keys), *extra)
@@ -0,0 +1,262 @@
+# core/utils/export_jobs.py
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from .exports import PdfSpool, too_many_to_merge
+from .ssrs import render_one, render_pool
+
+log = logging.getLogger(__name__)
+
+# =========================
+# Background bulk exports
+# =========================
+# One folder per job under EXPORT_JOBS_DIR:
+#   job.json   -> status, progress counters and the per-report manifest
+#   <result>   -> merged PDF or ZIP once the job is done
+# State lives on disk so any worker process can answer progress/download.
+# While a process holds queued/running jobs it touches their job.json every
+# _HEARTBEAT seconds; one left untouched for EXPORT_JOB_STALE_SECONDS lost
+# its process (restart) and is marked failed the next time it's loaded.
+
+_HEARTBEAT = 30
+
+_runner = None
+_runner_lock = threading.Lock()
+_state_lock = threading.Lock()
+_active = set()     # ids of this process's queued/running jobs
+
+
+def _jobs_dir():
+    d = getattr(settings, "EXPORT_JOBS_DIR", None)
+    return str(d) if d else os.path.join(str(settings.BASE_DIR), "export_jobs")
+
+
+def _job_dir(job_id):
+    # job ids are uuid hex; reject anything else so it can't escape the folder
+    if not job_id or not all(ch in "0123456789abcdef" for ch in job_id):
+        return None
+    return os.path.join(_jobs_dir(), job_id)
+
+
+def _job_runner():
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            workers = max(1, int(getattr(settings, "EXPORT_JOB_WORKERS", 1)))
+            _runner = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="export-job")
+            threading.Thread(target=_heartbeat, name="export-job-heartbeat", daemon=True).start()
+        return _runner
+
+
+def _heartbeat():
+    while True:
+        time.sleep(_HEARTBEAT)
+        with _state_lock:
+            ids = list(_active)
+        for job_id in ids:
+            try:
+                os.utime(os.path.join(_job_dir(job_id), "job.json"))
+            except OSError:
+                pass
+
+
+def _save(job):
+    path = os.path.join(_job_dir(job["id"]), "job.json")
+    tmp = f"{path}.tmp"
+    with _state_lock:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(job, f)
+        os.replace(tmp, path)
+
+
+def load(job_id):
+    d = _job_dir(job_id)
+    if not d:
+        return None
+    path = os.path.join(d, "job.json")
+    try:
+        with open(path, encoding="utf-8") as f:
+            job = json.load(f)
+        age = time.time() - os.path.getmtime(path)
+    except (OSError, ValueError):
+        return None
+
+    stale_after = max(_HEARTBEAT * 3, float(getattr(settings, "EXPORT_JOB_STALE_SECONDS", 300)))
+    if job["status"] in ("queued", "running") and job_id not in _active and age > stale_after:
+        job["status"] = "failed"
+        job["error"] = "The export was interrupted (server restarted). Please start it again."
+        job["finished_at"] = time.time()
+        _save(job)
+    return job
+
+
+def result_path(job):
+    return os.path.join(_job_dir(job["id"]), job["filename"])
+
+
+def progress(job):
+    """The public bits of a job for the progress endpoint."""
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "total": job["total"],
+        "done": job["done"],
+        "failed": job["failed"],
+        "failed_items": [m for m in job["manifest"] if m["status"] == "failed"],
+        "filename": job["filename"],
+        "error": job.get("error"),
+    }
+
+
+def _prune():
+    """Remove finished jobs older than EXPORT_JOB_TTL_HOURS."""
+    ttl = float(getattr(settings, "EXPORT_JOB_TTL_HOURS", 24)) * 3600
+    root = _jobs_dir()
+    if not os.path.isdir(root):
+        return
+    cutoff = time.time() - ttl
+    for e in os.scandir(root):
+        try:
+            if e.is_dir() and e.stat().st_mtime < cutoff:
+                shutil.rmtree(e.path, ignore_errors=True)
+        except OSError:
+            pass
+
+
+# ---------- submit ----------
+def submit(owner_id, fmt, t, jobs, fetch, versions=None):
+    """
+    Queue a background export. fmt is 'pdf' (merged) or 'zip'; jobs come from
+    ssrs.report_jobs. A 'pdf' past EXPORT_MERGE_MAX_REPORTS is built as a ZIP
+    (see exports.PdfSpool). Returns the job id right away.
+    """
+    _prune()
+    if fmt == "pdf" and too_many_to_merge(jobs):
+        fmt = "zip"
+    job_id = uuid.uuid4().hex
+    os.makedirs(_job_dir(job_id), exist_ok=True)
+
+    stamp = time.strftime("%Y%m%d_%H%M%S")
+    job = {
+        "id": job_id,
+        "owner": owner_id,
+        "format": fmt,
+        "type": t,
+        "status": "queued",
+        "total": len(jobs),
+        "done": 0,
+        "failed": 0,
+        "filename": f"export_{t}_{stamp}.{'zip' if fmt == 'zip' else 'pdf'}",
+        "created_at": time.time(),
+        "finished_at": None,
+        "manifest": [
+            {"file": j[0], "utilization_id": j[3], "report": j[1],
+             "status": "pending", "attempts": 0, "error": None}
+            for j in jobs
+        ],
+    }
+    _save(job)
+    with _state_lock:
+        _active.add(job_id)
+    _job_runner().submit(_run, job, jobs, fetch, versions or {})
+    return job_id
+
+
+# ---------- worker ----------
+def _run(job, jobs, fetch, versions):
+    try:
+        _render_all(job, jobs, fetch, versions)
+    finally:
+        with _state_lock:
+            _active.discard(job["id"])
+
+
+def _render_all(job, jobs, fetch, versions):
+    job["status"] = "running"
+    _save(job)
+    tries = max(1, int(getattr(settings, "EXPORT_JOB_RETRIES", 2)) + 1)
+
+    out_path = result_path(job)
+    window = max(1, int(getattr(settings, "SSRS_RENDER_WORKERS", 4))) * 2
+    pending = deque()
+    it = iter(enumerate(jobs))
+
+    def _fill():
+        while len(pending) < window:
+            nxt = next(it, None)
+            if nxt is None:
+                return
+            i, j = nxt
+            pending.append((i, j, 1, render_pool().submit(render_one, j, fetch, versions)))
+
+    zf = spool = None
+    try:
+        if job["format"] == "zip":
+            zf = zipfile.ZipFile(out_path, "w", zipfile.ZIP_DEFLATED)
+        else:
+            spool = PdfSpool()
+
+        _fill()
+        while pending:
+            i, j, attempt, fut = pending.popleft()
+            try:
+                pdf, err = fut.result(), None
+            except Exception as e:
+                if attempt < tries:
+                    # back off here, on the job thread, not on a shared render thread
+                    time.sleep(min(30, 2 ** attempt))
+                    pending.appendleft((i, j, attempt + 1, render_pool().submit(render_one, j, fetch, versions)))
+                    continue
+                pdf, err = None, str(e)[:500]
+            entry = job["manifest"][i]
+            entry["attempts"] = attempt
+            if err is None:
+                if zf is not None:
+                    zf.writestr(entry["file"], pdf)
+                else:
+                    spool.add(pdf)
+                entry["status"] = "done"
+                job["done"] += 1
+            else:
+                entry["status"] = "failed"
+                entry["error"] = err
+                job["failed"] += 1
+            _save(job)
+            _fill()
+
+        if zf is not None:
+            zf.writestr("manifest.json", json.dumps(job["manifest"], indent=2))
+            zf.close()
+        else:
+            with open(out_path, "wb") as f:
+                spool.write(f)
+
+        job["status"] = "done" if job["done"] else "failed"
+    except Exception as e:
+        log.exception("Export job %s failed", job["id"])
+        if zf is not None:
+            try:
+                zf.close()
+            except Exception:
+                pass
+        if spool is not None:
+            spool.close()
+        # don't leave a truncated ZIP/PDF behind for the download endpoint
+        try:
+            os.remove(out_path)
+        except OSError:
+            pass
+        job["status"] = "failed"
+        job["error"] = str(e)[:500]
+    job["finished_at"] = time.time()
+    _save(job)
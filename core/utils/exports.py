@@ -0,0 +1,191 @@
+# core/utils/exports.py
+import io
+import itertools
+import logging
+import os
+import re
+import tempfile
+import zipfile
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from PyPDF2 import PdfMerger
+
+log = logging.getLogger(__name__)
+
+
+def primed(pdfs):
+    """
+    Pull the first PDF right away so an SSRS failure up front can still be
+    turned into a normal 502 before any bytes are streamed.
+    """
+    pdfs = iter(pdfs)
+    try:
+        first = next(pdfs)
+    except StopIteration:
+        return iter(())
+    return itertools.chain([first], pdfs)
+
+
+# ---------- spooled PDF merge ----------
+def _spool_bytes():
+    return int(getattr(settings, "EXPORT_SPOOL_BYTES", 16 * 1024 * 1024))
+
+
+class PdfSpool:
+    """
+    PdfMerger whose inputs stay in memory only up to EXPORT_SPOOL_BYTES in
+    total; past that every input goes to its own temp file. Add PDFs as they
+    arrive, then finish() for the merged file.
+    Only the input bytes are bounded: PdfMerger still builds the page/object
+    tree of every input in memory until write(), so peak memory grows with
+    the number of pages merged. Callers cap that with too_many_to_merge():
+    past EXPORT_MERGE_MAX_REPORTS reports they ZIP instead of merging.
+    """
+
+    def __init__(self):
+        self.merger = PdfMerger()
+        self.files = []
+        self.in_memory = 0
+
+    def add(self, pdf):
+        if self.in_memory + len(pdf) <= _spool_bytes():
+            f = io.BytesIO(pdf)
+            self.in_memory += len(pdf)
+        else:
+            f = tempfile.TemporaryFile()
+            f.write(pdf)
+            f.seek(0)
+        self.files.append(f)
+        self.merger.append(f)
+
+    def write(self, out):
+        try:
+            self.merger.write(out)
+        finally:
+            self.close()
+
+    def finish(self):
+        """Merged PDF as a rewound file object (spills to disk when large)."""
+        out = tempfile.SpooledTemporaryFile(max_size=_spool_bytes())
+        self.write(out)
+        out.seek(0)
+        return out
+
+    def close(self):
+        try:
+            self.merger.close()
+        except Exception:
+            pass
+        for f in self.files:
+            try:
+                f.close()
+            except Exception:
+                pass
+        self.files = []
+
+
+def too_many_to_merge(jobs):
+    """True when jobs (ssrs.report_jobs) are past EXPORT_MERGE_MAX_REPORTS and should be ZIPped."""
+    return len(jobs) > int(getattr(settings, "EXPORT_MERGE_MAX_REPORTS", 200))
+
+
+def merge_pdfs(pdfs):
+    """Merge an iterable of PDF bytes incrementally; returns the rewound merged file (see PdfSpool for memory)."""
+    spool = PdfSpool()
+    try:
+        for pdf in pdfs:
+            spool.add(pdf)
+    except BaseException:
+        spool.close()
+        raise
+    return spool.finish()
+
+
+# ---------- streaming ZIP ----------
+class _ZipSink:
+    """Write-only target for zipfile; zip_stream drains it after every entry."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        out = b"".join(self._chunks)
+        self._chunks = []
+        return out
+
+
+def zip_stream(jobs, pdfs):
+    """
+    Yield a ZIP archive chunk by chunk: one entry per (job, pdf) as soon as
+    the PDF is ready. If a render fails mid-stream the archive is still
+    closed properly with an ERRORS.txt entry explaining what went wrong.
+    """
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED) as zf:
+        try:
+            for job, pdf in zip(jobs, pdfs):
+                zf.writestr(job[0], pdf)
+                yield sink.drain()
+        except Exception as e:
+            log.exception("ZIP export stopped")
+            zf.writestr("ERRORS.txt", f"Export stopped before all reports were added.\n\n{e}\n")
+    yield sink.drain()
+
+
+def zip_download(jobs, pdfs, filename):
+    """Streamed ZIP attachment of one entry per (job, pdf); see zip_stream."""
+    resp = StreamingHttpResponse(zip_stream(jobs, pdfs), content_type="application/zip")
+    resp['Content-Disposition'] = f'attachment; filename={filename}'
+    return resp
+
+
+# ---------- resumable file download ----------
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _read_range(path, start, length, chunk=64 * 1024):
+    with open(path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            data = f.read(min(chunk, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+
+
+def ranged_file_response(request, path, content_type, filename):
+    """
+    Serve a finished export file. Honours a single 'Range: bytes=a-b' header
+    (206 Partial Content) so browsers/download managers can resume.
+    """
+    size = os.path.getsize(path)
+    m = _RANGE_RE.match((request.headers.get("Range") or "").strip())
+    if m and (m.group(1) or m.group(2)):
+        if m.group(1):
+            start = int(m.group(1))
+            end = min(int(m.group(2)), size - 1) if m.group(2) else size - 1
+        else:
+            start = max(0, size - int(m.group(2)))
+            end = size - 1
+        if start >= size or start > end:
+            resp = HttpResponse(status=416)
+            resp["Content-Range"] = f"bytes */{size}"
+            return resp
+        length = end - start + 1
+        resp = StreamingHttpResponse(_read_range(path, start, length), status=206, content_type=content_type)
+        resp["Content-Range"] = f"bytes {start}-{end}/{size}"
+        resp["Content-Length"] = str(length)
+    else:
+        resp = FileResponse(open(path, "rb"), content_type=content_type)
+    resp["Accept-Ranges"] = "bytes"
+    resp["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return resp
@@ -0,0 +1,150 @@
+# core/utils/live.py
+import asyncio
+import json
+import threading
+import time
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.http import HttpResponse, StreamingHttpResponse
+
+from . import versions
+
+
+# =========================
+# Live updates over server-sent events
+# =========================
+# Topics use the Pusher channel names: "lab-<id>" and "teacher-<id>".
+# Every event the realtime outbox sends (active_sessions per lab) is also
+# handed to publish() here, plus attendance/session deltas from the taps,
+# and fanned out to the open streams in this process. A stream sits idle
+# between events instead of polling the DB.
+# Each publish also bumps a shared per-topic version; a stream that sees
+# the version move without getting the event (it happened in another
+# worker) sends "refresh" so the page re-fetches once. Pages keep a slow
+# safety poll next to the stream in case both are missed.
+# Streams are ASGI only: each is a coroutine, where under WSGI it would pin
+# a worker thread per open tab. SSE_ENABLED turns them on (set it only when
+# serving CAPSTONE.asgi); otherwise, or on a WSGI request, the stream URL
+# answers 204 and the browser stops reconnecting.
+
+_lock = threading.Lock()
+_subs = defaultdict(set)    # topic -> {_Sub}
+
+
+def _vkey(topic):
+    return f"live:{topic}"
+
+
+def enabled():
+    """Whether pages should open event streams (SSE_ENABLED, ASGI deployments only)."""
+    return bool(getattr(settings, "SSE_ENABLED", False))
+
+
+class _Sub:
+    def __init__(self, topic, seen):
+        self.topic = topic
+        self.seen = seen
+        self.loop = asyncio.get_running_loop()
+        self.q = asyncio.Queue()
+
+    def deliver(self, item):
+        self.loop.call_soon_threadsafe(self.q.put_nowait, item)
+
+    async def get(self, timeout):
+        try:
+            return await asyncio.wait_for(self.q.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+def _subscribe(sub):
+    with _lock:
+        _subs[sub.topic].add(sub)
+
+
+def _unsubscribe(sub):
+    with _lock:
+        subs = _subs.get(sub.topic)
+        if subs is not None:
+            subs.discard(sub)
+            if not subs:
+                del _subs[sub.topic]
+
+
+def publish(topic, event, data):
+    """Send event to every stream on topic (this process now, others via "refresh")."""
+    ver = versions.bump(_vkey(topic))
+    with _lock:
+        subs = list(_subs.get(topic, ()))
+    for sub in subs:
+        try:
+            sub.deliver((event, data, ver))
+        except RuntimeError:
+            _unsubscribe(sub)  # its event loop is gone
+
+
+def version_key(topic):
+    return _vkey(topic)
+
+
+def version(topic):
+    """Shared per-topic version; moves on every publish."""
+    return versions.current(_vkey(topic))
+
+
+def publish_on_commit(topic, event, data):
+    transaction.on_commit(lambda: publish(topic, event, data))
+
+
+def _frame(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def _timing():
+    check = max(1.0, float(getattr(settings, "SSE_CHECK_SECONDS", 5)))
+    lifetime = max(check, float(getattr(settings, "SSE_MAX_SECONDS", 300)))
+    return check, time.monotonic() + lifetime
+
+
+async def _on_idle(sub):
+    """Nothing arrived: "refresh" if another worker published, else a keep-alive comment."""
+    # cache reads are blocking; keep them off the event loop
+    cur = await sync_to_async(versions.current, thread_sensitive=False)(_vkey(sub.topic))
+    if cur != sub.seen:
+        sub.seen = cur
+        return _frame("refresh", {})
+    return ": ping\n\n"
+
+
+def _on_item(sub, item):
+    event, data, ver = item
+    sub.seen = ver if sub.seen is None else max(sub.seen, ver)
+    return _frame(event, data)
+
+
+async def _astream(topic, seen):
+    sub = _Sub(topic, seen)
+    _subscribe(sub)
+    try:
+        check, deadline = _timing()
+        yield "retry: 3000\n\n"
+        while time.monotonic() < deadline:
+            item = await sub.get(check)
+            yield _on_item(sub, item) if item else await _on_idle(sub)
+    finally:
+        _unsubscribe(sub)
+
+
+def response(request, topic):
+    """text/event-stream for topic; closes after SSE_MAX_SECONDS and the browser reconnects."""
+    if not enabled() or not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)  # EventSource gives up; the page's poll carries on
+    seen = versions.current(_vkey(topic))  # read here, in the sync view, not on the loop
+    resp = StreamingHttpResponse(_astream(topic, seen), content_type="text/event-stream")
+    resp["Cache-Control"] = "no-cache"
+    resp["X-Accel-Buffering"] = "no"  # nginx: don't buffer the stream
+    return resp
@@ -0,0 +1,192 @@
+# core/utils/local_reports.py
+import logging
+
+import requests
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.db import connection, close_old_connections
+from django.template.loader import render_to_string
+
+try:
+    from weasyprint import HTML, default_url_fetcher
+    WEASY_OK = True
+except Exception:
+    WEASY_OK = False
+
+log = logging.getLogger(__name__)
+
+# =========================
+# Local (WeasyPrint) report renderer
+# =========================
+# REPORT_RENDERERS picks the engine per report path:
+#   "ssrs"  -> report server only (default)
+#   "local" -> Django template + WeasyPrint only
+#   "auto"  -> report server, falling back to local if SSRS errors
+
+class ReportRenderError(requests.HTTPError):
+    """Local render failure; subclass of HTTPError so the print views' except blocks catch it."""
+
+
+class FallbackPdf(bytes):
+    """PDF rendered locally because SSRS failed ("auto"); report_cache doesn't store these."""
+
+
+def renderer_for(report_path):
+    mode = (getattr(settings, "REPORT_RENDERERS", {}) or {}).get(report_path, "ssrs")
+    mode = str(mode).lower()
+    return mode if mode in ("ssrs", "local", "auto") else "ssrs"
+
+
+def engine_for(report_path):
+    """Engine whose output gets cached for report_path ("auto" only caches SSRS output)."""
+    return "local" if renderer_for(report_path) == "local" else "ssrs"
+
+
+def _template_for(report_path):
+    if report_path == settings.SSRS_UTILIZATION_REPORT_PATH:
+        return "admin/print_utilization_slip.html"
+    if report_path == settings.SSRS_ATTENDANCE_REPORT_PATH:
+        return "admin/print_attendance_sheet.html"
+    return None
+
+
+def _uid_from(report_path, params):
+    name = (settings.SSRS_UTIL_PARAM_NAME
+            if report_path == settings.SSRS_UTILIZATION_REPORT_PATH
+            else settings.SSRS_ATTEND_PARAM_NAME)
+    try:
+        return int(params.get(name))
+    except (TypeError, ValueError):
+        return None
+
+
+def _hhmm(t):
+    return t.strftime('%H:%M') if t else "—"
+
+
+def slip_context(utilization_id):
+    """Everything both printable templates need for one utilization slip (None if missing)."""
+    # render threads keep their own connection; drop it if it went stale
+    close_old_connections()
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT
+                u.date,
+                u.start_time,
+                u.end_time,
+                l.lab_num,
+                CONCAT(f.first_name, ' ', f.last_name) AS teacher_name,
+                c.course_code,
+                u.student_year_and_section,
+                CAST(COALESCE(u.remarks,'') AS NVARCHAR(4000)) AS remarks,
+                u.processed_by,
+                u.created_at,
+                s.term,
+                s.school_year
+            FROM UTILIZATION_SLIP u
+            JOIN LABORATORIES l       ON u.lab_id = l.lab_id
+            JOIN FACULTY f            ON u.requested_by = f.faculty_id
+            LEFT JOIN LAB_SCHEDULE ls      ON u.schedule_id = ls.schedule_id
+            LEFT JOIN ASSIGNED_TEACHER at  ON ls.assigned_teacher_id = at.assigned_teacher_id
+            LEFT JOIN COURSE c             ON at.course_id = c.course_id
+            LEFT JOIN SEMESTER s           ON at.semester_id = s.semester_id
+            WHERE u.utilization_id = %s
+        """, [utilization_id])
+        row = cursor.fetchone()
+        if not row:
+            return None
+
+        (date_val, start_time, end_time, lab_num, teacher_name, course_code, section,
+         remarks, processed_by_id, created_at, term, sy) = row
+
+        processed_by_name = "N/A"
+        if processed_by_id:
+            cursor.execute("""
+                SELECT CONCAT(first_name, ' ', last_name)
+                FROM FACULTY WHERE faculty_id = %s
+            """, [processed_by_id])
+            name_row = cursor.fetchone()
+            if name_row:
+                processed_by_name = name_row[0]
+
+        cursor.execute("""
+            SELECT CONCAT(s.first_name, ' ', COALESCE(s.middle_name,''), ' ', s.last_name)
+            FROM COMPUTER_LAB_ATTENDANCE a
+            JOIN STUDENTS s ON a.student_id = s.student_id
+            WHERE a.utilization_id = %s
+            ORDER BY s.last_name, s.first_name
+        """, [utilization_id])
+        students = [r[0].strip().replace("  ", " ") for r in cursor.fetchall()]
+
+    time_duration = f"{_hhmm(start_time)} - {_hhmm(end_time)}"
+    remaining = max(0, 30 - len(students))
+    request_date = date_val.strftime("%B %d, %Y") if date_val else ""
+
+    return {
+        "utilization_id": utilization_id,
+        "date": date_val,
+        "time_duration": time_duration,
+        "lab_num": lab_num,
+        "teacher_name": teacher_name,
+        "course_code": course_code,
+        "course_name": course_code,
+        "section": section,
+        "year_section": section,
+        "students_present": len(students),
+        "remarks": remarks or "N/A",
+        "processed_by": processed_by_name,
+        "processed_date": created_at.strftime("%Y-%m-%d") if created_at else "—",
+        "students": students,
+        "semester_ay": f"{term}, A.Y. {sy}" if term and sy else "—",
+        "request_date": request_date,
+        "instructor_name": teacher_name,
+        "lab_assistant_name": processed_by_name,
+        "room_number": lab_num,
+        "date_time": f"{request_date} / {time_duration}",
+        "range": range(1, 31),
+        "blank_rows": range(1, remaining + 1),
+    }
+
+
+def _url_fetcher(url, *args, **kwargs):
+    # {% static %} gives /static/...; serve those straight from the finders
+    prefix = "file://" + settings.STATIC_URL
+    if url.startswith(prefix):
+        found = finders.find(url[len(prefix):])
+        if found:
+            url = "file://" + found
+    return default_url_fetcher(url, *args, **kwargs)
+
+
+def render(report_path, params):
+    """Render one report PDF from its Django template."""
+    if not WEASY_OK:
+        raise ReportRenderError("Local report renderer needs WeasyPrint (pip install weasyprint).")
+    template = _template_for(report_path)
+    uid = _uid_from(report_path, params)
+    if not template or uid is None:
+        raise ReportRenderError(f"No local template for {report_path}")
+
+    ctx = slip_context(uid)
+    if ctx is None:
+        raise ReportRenderError(f"Utilization {uid} not found")
+
+    html = render_to_string(template, ctx)
+    try:
+        return HTML(string=html, base_url="file:///", url_fetcher=_url_fetcher).write_pdf()
+    except Exception as e:
+        raise ReportRenderError(f"Local render failed for {report_path} #{uid}: {e}") from e
+
+
+def render_pdf(report_path, params, ssrs_fetch):
+    """Pick the engine for report_path; ssrs_fetch() does the report server call."""
+    mode = renderer_for(report_path)
+    if mode == "local":
+        return render(report_path, params)
+    try:
+        return ssrs_fetch()
+    except requests.HTTPError as e:
+        if mode != "auto" or not WEASY_OK:
+            raise
+        log.warning("SSRS failed for %s, rendering locally: %s", report_path, str(e)[:200])
+        return FallbackPdf(render(report_path, params))
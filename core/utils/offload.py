@@ -0,0 +1,43 @@
+# core/utils/offload.py
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.db import close_old_connections
+
+
+# =========================
+# Bounded DB pool for async views
+# =========================
+# Async views (ASGI) hand their blocking DB work to this fixed pool, so the
+# event loop keeps accepting taps and at most RFID_DB_WORKERS connections
+# are busy at once; extra work queues here instead of piling onto the DB.
+# Each call cleans up its thread's Django connection like a request would.
+
+_lock = threading.Lock()
+_executor = None
+
+
+def executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            workers = max(1, int(getattr(settings, "RFID_DB_WORKERS", 8)))
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rfid-db")
+    return _executor
+
+
+def _call(fn, args, kwargs):
+    close_old_connections()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run(fn, *args, **kwargs):
+    """await fn(*args, **kwargs) on the DB pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor(), partial(_call, fn, args, kwargs))
@@ -0,0 +1,101 @@
+# core/utils/prerender.py
+import heapq
+import logging
+import itertools
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from . import report_cache
+from .local_reports import FallbackPdf
+from .ssrs import report_jobs, render_one
+
+log = logging.getLogger(__name__)
+
+# =========================
+# Pre-render reports when a session completes
+# =========================
+# A single background thread works through a due-time heap. A slip is only
+# queued once at a time (dedup); failures are re-queued with exponential
+# backoff up to REPORT_PRERENDER_ATTEMPTS. Nothing here blocks the caller.
+
+_cond = threading.Condition()
+_heap = []           # (due, seq, utilization_id, attempt)
+_queued = set()      # ids waiting or being rendered
+_seq = itertools.count()
+_fetch = None
+_worker = None
+
+
+def enqueue(utilization_ids, fetch):
+    """
+    Queue UtilizationSlip + AttendanceSheet for these slips once the current
+    transaction commits (right away in autocommit). fetch is the views' _ssrs_pdf.
+    """
+    if not getattr(settings, "REPORT_PRERENDER", True):
+        return
+    ids = [int(i) for i in utilization_ids if i]
+    if ids:
+        transaction.on_commit(lambda: _push(ids, fetch))
+
+
+def _push(ids, fetch):
+    global _fetch
+    due = time.monotonic() + float(getattr(settings, "REPORT_PRERENDER_DELAY", 5))
+    with _cond:
+        _fetch = fetch
+        for uid in ids:
+            if uid in _queued:
+                continue
+            _queued.add(uid)
+            heapq.heappush(_heap, (due, next(_seq), uid, 0))
+        _ensure_worker()
+        _cond.notify()
+
+
+def _ensure_worker():
+    global _worker
+    if _worker is None or not _worker.is_alive():
+        _worker = threading.Thread(target=_loop, name="report-prerender", daemon=True)
+        _worker.start()
+
+
+def _render(uid, fetch):
+    close_old_connections()
+    try:
+        versions = report_cache.slip_versions([uid])
+        if uid not in versions:
+            return True  # not Completed (or gone) -> nothing worth caching
+        cached = True
+        for job in report_jobs([uid], "both"):
+            if isinstance(render_one(job, fetch, versions), FallbackPdf):
+                cached = False  # SSRS was down; retry later so the cache gets the real report
+        return cached
+    except Exception as e:
+        log.warning("Pre-render failed for utilization %s: %s", uid, str(e)[:300])
+        return False
+    finally:
+        close_old_connections()
+
+
+def _loop():
+    max_attempts = max(1, int(getattr(settings, "REPORT_PRERENDER_ATTEMPTS", 5)))
+    base = float(getattr(settings, "REPORT_PRERENDER_BACKOFF", 30))
+
+    while True:
+        with _cond:
+            while not _heap or _heap[0][0] > time.monotonic():
+                _cond.wait(_heap[0][0] - time.monotonic() if _heap else None)
+            _, _, uid, attempt = heapq.heappop(_heap)
+            fetch = _fetch
+
+        ok = _render(uid, fetch)
+
+        with _cond:
+            if ok or attempt + 1 >= max_attempts:
+                _queued.discard(uid)
+            else:
+                delay = min(base * (2 ** attempt), 3600)
+                heapq.heappush(_heap, (time.monotonic() + delay, next(_seq), uid, attempt + 1))
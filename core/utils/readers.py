@@ -0,0 +1,217 @@
+# core/utils/readers.py
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from . import versions
+
+log = logging.getLogger(__name__)
+
+# =========================
+# RFID reader registry
+# =========================
+# rfid_reader_id -> (lab_id, lab_num), held in this process and rebuilt
+# when the shared version (settings.CACHES) moves: lab add/edit/archive/
+# restore/delete call changed(). A reader the map doesn't know is looked up
+# in LABORATORIES before it counts as unregistered. Next to it, a
+# last-seen record per reader fed by every tap and by the readers'
+# heartbeat pings: kept in this process, and merged into the shared cache
+# at most every READER_SEEN_WRITE_SECONDS per reader, so status() sees the
+# taps every worker took.
+
+_VERSION_KEY = "rfid_readers:version"
+_UNKNOWN_KEY = "rfid_readers:unknown"    # unregistered readers any worker heard from
+_SHARED_TTL = 7 * 24 * 3600
+
+_lock = threading.Lock()
+_labs = {}
+_version = None
+
+_seen = {}          # reader_id -> {"last_seen", "last_tap", "taps", "heartbeats", "pushed_*"}
+_seen_lock = threading.Lock()
+
+
+def _reload():
+    global _labs, _version
+    version = versions.current(_VERSION_KEY)
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT rfid_reader_id, lab_id, lab_num
+              FROM LABORATORIES
+             WHERE rfid_reader_id IS NOT NULL AND rfid_reader_id <> ''
+        """)
+        labs = {str(r[0]).strip(): (r[1], r[2]) for r in cursor.fetchall()}
+    with _lock:
+        _labs, _version = labs, version
+
+
+def _current():
+    if _version is None or _version != versions.current(_VERSION_KEY):
+        _reload()
+
+
+def _lookup(rid):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT TOP 1 lab_id, lab_num FROM LABORATORIES WHERE rfid_reader_id = %s", [rid])
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    lab = (row[0], row[1])
+    with _lock:
+        _labs[rid] = lab
+    return lab
+
+
+def lab_for(reader_id):
+    """(lab_id, lab_num) for a registered reader, else None."""
+    rid = str(reader_id or "").strip()
+    if not rid:
+        return None
+    _current()
+    with _lock:
+        lab = _labs.get(rid)
+    return lab if lab is not None else _lookup(rid)
+
+
+def version_key():
+    return _VERSION_KEY
+
+
+def version():
+    """Shared version; moves on every LABORATORIES write (add/edit/archive/restore/delete)."""
+    return versions.current(_VERSION_KEY)
+
+
+def registered():
+    """{reader_id: (lab_id, lab_num)} for every reader assigned to a lab."""
+    _current()
+    with _lock:
+        return dict(_labs)
+
+
+def changed():
+    """Call after any LABORATORIES write that can touch rfid_reader_id."""
+    def _bump():
+        global _version
+        versions.bump(_VERSION_KEY)
+        with _lock:
+            _version = None
+    transaction.on_commit(_bump)
+
+
+# ---------- heartbeat / last seen ----------
+def _seen_key(rid):
+    return f"rfid_readers:seen:{rid}"
+
+
+def _count_key(rid, kind):
+    return f"rfid_readers:{kind}:{rid}"
+
+
+def _latest(*stamps):
+    stamps = [s for s in stamps if s]
+    return max(stamps) if stamps else None
+
+
+def _incr(key, delta):
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        cache.add(key, 0, _SHARED_TTL)
+        cache.incr(key, delta)
+
+
+def _push(rid, rec):
+    """Merge this process's record (a snapshot) for rid into the shared one."""
+    key = _seen_key(rid)
+    shared = cache.get(key) or {}
+    cache.set(key, {
+        "last_seen": _latest(rec["last_seen"], shared.get("last_seen")),
+        "last_tap": _latest(rec["last_tap"], shared.get("last_tap")),
+    }, _SHARED_TTL)
+    for kind in ("taps", "heartbeats"):
+        delta = rec[kind] - rec[f"pushed_{kind}"]
+        if delta:
+            _incr(_count_key(rid, kind), delta)
+    if lab_for(rid) is None:
+        unknown = set(cache.get(_UNKNOWN_KEY) or ())
+        if rid not in unknown:
+            cache.set(_UNKNOWN_KEY, sorted(unknown | {rid}), _SHARED_TTL)
+
+
+def seen(reader_id, tap=True):
+    """Record that a reader talked to us (a tap, or a heartbeat when tap=False)."""
+    rid = str(reader_id or "").strip()
+    if not rid:
+        return
+    now = time.time()
+    every = float(getattr(settings, "READER_SEEN_WRITE_SECONDS", 30))
+    with _seen_lock:
+        rec = _seen.get(rid)
+        if rec is None:
+            rec = _seen[rid] = {"last_seen": None, "last_tap": None, "taps": 0, "heartbeats": 0,
+                                "pushed_at": 0.0, "pushed_taps": 0, "pushed_heartbeats": 0}
+        rec["last_seen"] = now
+        if tap:
+            rec["last_tap"] = now
+            rec["taps"] += 1
+        else:
+            rec["heartbeats"] += 1
+        if now - rec["pushed_at"] < every:
+            return
+        rec["pushed_at"] = now
+        snapshot = dict(rec)
+
+    try:
+        _push(rid, snapshot)
+    except Exception:
+        log.exception("Reader last-seen update failed for %s", rid)
+        return
+    with _seen_lock:
+        rec["pushed_taps"] = snapshot["taps"]
+        rec["pushed_heartbeats"] = snapshot["heartbeats"]
+
+
+def status():
+    """
+    One row per registered reader plus any unknown reader that has pinged any
+    worker. A reader is "offline" once it's been quiet for
+    READER_OFFLINE_SECONDS. Other workers' taps show up within
+    READER_SEEN_WRITE_SECONDS.
+    """
+    offline_after = float(getattr(settings, "READER_OFFLINE_SECONDS", 300))
+    now = time.time()
+    labs = registered()
+    with _seen_lock:
+        seen_copy = {k: dict(v) for k, v in _seen.items()}
+
+    ids = sorted(set(labs) | set(seen_copy) | set(cache.get(_UNKNOWN_KEY) or ()))
+    shared = cache.get_many([k for rid in ids for k in (
+        _seen_key(rid), _count_key(rid, "taps"), _count_key(rid, "heartbeats"))])
+
+    rows = []
+    for rid in ids:
+        rec = seen_copy.get(rid, {})
+        sh = shared.get(_seen_key(rid)) or {}
+        last = _latest(rec.get("last_seen"), sh.get("last_seen"))
+        lab = labs.get(rid)
+        rows.append({
+            "reader_id": rid,
+            "lab_id": lab[0] if lab else None,
+            "lab_num": lab[1] if lab else None,
+            "registered": lab is not None,
+            "last_seen": last,
+            "last_tap": _latest(rec.get("last_tap"), sh.get("last_tap")),
+            "seconds_since": round(now - last) if last else None,
+            # shared totals plus what this process hasn't pushed yet
+            "taps": (shared.get(_count_key(rid, "taps")) or 0)
+                    + rec.get("taps", 0) - rec.get("pushed_taps", 0),
+            "heartbeats": (shared.get(_count_key(rid, "heartbeats")) or 0)
+                          + rec.get("heartbeats", 0) - rec.get("pushed_heartbeats", 0),
+            "state": "never" if not last else ("online" if now - last <= offline_after else "offline"),
+        })
+    return rows
@@ -0,0 +1,160 @@
+# core/utils/report_cache.py
+import hashlib
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.db import connection
+
+from .local_reports import FallbackPdf, engine_for
+
+log = logging.getLogger(__name__)
+
+# ---------- where + how big ----------
+def _cache_dir():
+    d = getattr(settings, "REPORT_CACHE_DIR", None)
+    return str(d) if d else os.path.join(str(settings.MEDIA_ROOT), "report_cache")
+
+
+def _max_bytes():
+    return int(getattr(settings, "REPORT_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+
+
+# ---------- content version ----------
+def slip_versions(ids):
+    """
+    {utilization_id: version} for Completed slips only. The version is a hash
+    of the slip row plus its attendance rows, so any edit gives a new key.
+    Slips that aren't Completed (or don't exist) are left out = not cached.
+    """
+    ids = [int(i) for i in ids if i is not None and str(i).strip().isdigit()]
+    if not ids:
+        return {}
+
+    slips, attendance = {}, {}
+    with connection.cursor() as cursor:
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            marks = ",".join(["%s"] * len(chunk))
+            cursor.execute(f"""
+                SELECT utilization_id, status, date, start_time, end_time, time_duration,
+                       student_year_and_section, CAST(COALESCE(remarks,'') AS NVARCHAR(4000)),
+                       processed_by, requested_by, lab_id, schedule_id
+                FROM UTILIZATION_SLIP
+                WHERE utilization_id IN ({marks})
+            """, chunk)
+            for r in cursor.fetchall():
+                if (r[1] or "").strip().upper() == "COMPLETED":
+                    slips[r[0]] = r
+
+            cursor.execute(f"""
+                SELECT utilization_id, attendance_sheet_id, student_id, time_in, time_out
+                FROM COMPUTER_LAB_ATTENDANCE
+                WHERE utilization_id IN ({marks})
+                ORDER BY utilization_id, attendance_sheet_id
+            """, chunk)
+            for r in cursor.fetchall():
+                attendance.setdefault(r[0], []).append(r[1:])
+
+    out = {}
+    for uid, row in slips.items():
+        raw = repr((row, attendance.get(uid, []))).encode("utf-8")
+        out[uid] = hashlib.sha1(raw).hexdigest()
+    return out
+
+
+# ---------- disk store ----------
+_evict_lock = threading.Lock()
+_approx_bytes = None  # running size estimate; None = unknown, scan on next put
+
+
+def _path_for(report_path, uid, version):
+    # the engine is part of the key so switching REPORT_RENDERERS never serves the other engine's PDF
+    key = hashlib.sha256(f"{report_path}|{engine_for(report_path)}|{uid}|{version}".encode("utf-8")).hexdigest()
+    return os.path.join(_cache_dir(), key[:2], f"{key}.pdf")
+
+
+def get(report_path, uid, version):
+    """Cached PDF bytes or None. A hit bumps mtime so eviction is LRU."""
+    if not version:
+        return None
+    path = _path_for(report_path, uid, version)
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    try:
+        os.utime(path, None)
+    except OSError:
+        pass
+    return data
+
+
+def put(report_path, uid, version, pdf):
+    if not version or not pdf:
+        return
+    path = _path_for(report_path, uid, version)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(pdf)
+        os.replace(tmp, path)
+    except OSError as e:
+        log.warning("Report cache write failed: %s", e)
+        return
+
+    global _approx_bytes
+    if _approx_bytes is not None:
+        _approx_bytes += len(pdf)
+        if _approx_bytes <= _max_bytes():
+            return
+    _evict()
+
+
+def _evict():
+    """Delete least-recently-used files until the cache fits REPORT_CACHE_MAX_BYTES."""
+    global _approx_bytes
+    limit = _max_bytes()
+    root = _cache_dir()
+    if not _evict_lock.acquire(blocking=False):
+        return  # another thread is already trimming
+    try:
+        files, total = [], 0
+        for sub in os.scandir(root):
+            if not sub.is_dir():
+                continue
+            for e in os.scandir(sub.path):
+                if not e.name.endswith(".pdf"):
+                    continue
+                st = e.stat()
+                files.append((st.st_mtime, st.st_size, e.path))
+                total += st.st_size
+        if total > limit:
+            files.sort()
+            for _, size, path in files:
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                if total <= limit:
+                    break
+        _approx_bytes = total
+    except OSError:
+        _approx_bytes = None
+    finally:
+        _evict_lock.release()
+
+
+def get_or_render(report_path, uid, version, render):
+    """Serve from disk when possible, otherwise render() and store the result (unless it's a fallback)."""
+    pdf = get(report_path, uid, version)
+    if pdf is not None:
+        return pdf
+    pdf = render()
+    if not isinstance(pdf, FallbackPdf):
+        put(report_path, uid, version, pdf)
+    return pdf
@@ -0,0 +1,147 @@
+# core/utils/rfid_index.py
+import logging
+import threading
+
+from django.db import close_old_connections, connection, transaction
+
+from . import versions
+
+log = logging.getLogger(__name__)
+
+
+# =========================
+# RFID identity index (check-in hot path)
+# =========================
+# sticker id -> (id, first_name, last_name) for active faculty and students,
+# held in this process. Every admin edit that can change who owns a card
+# calls teacher_changed()/student_changed(): that bumps a shared version in
+# the Django cache and patches this process's copy. Other workers see the
+# version moved and reload on their next tap. Teachers win over students
+# for the same sticker, same as the old FACULTY-then-STUDENTS lookup.
+# The version is a shared counter (versions, "versions" cache alias) read
+# at most every VERSION_CHECK_SECONDS, so a tap needs no round trip. A sticker the
+# index doesn't know still gets that single-row lookup before it counts
+# as unknown, so a card assigned a moment ago works on every worker.
+
+_VERSION_KEY = "rfid_index:version"
+
+_lock = threading.RLock()
+_teachers = {}
+_students = {}
+_version = None     # shared version this copy matches (None = not loaded)
+
+
+def _load_rows(table, id_col, where="", params=()):
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT rfid_sticker_id, {id_col}, first_name, last_name
+              FROM {table}
+             WHERE rfid_sticker_id IS NOT NULL AND rfid_sticker_id <> ''
+               AND ISNULL(is_archived,0) = 0 {where}
+        """, list(params))
+        return cursor.fetchall()
+
+
+def reload():
+    """Rebuild the whole index from the database."""
+    global _teachers, _students, _version
+    version = versions.current(_VERSION_KEY)
+    teachers = {str(r[0]).strip(): (r[1], r[2], r[3]) for r in _load_rows("FACULTY", "faculty_id")}
+    students = {str(r[0]).strip(): (r[1], r[2], r[3]) for r in _load_rows("STUDENTS", "student_id")}
+    with _lock:
+        _teachers, _students, _version = teachers, students, version
+    log.info("RFID index loaded: %s teachers, %s students (v%s)", len(teachers), len(students), version)
+
+
+def warm():
+    """Load in a background thread (first request after startup)."""
+    def _run():
+        close_old_connections()
+        try:
+            reload()
+        except Exception:
+            log.exception("RFID index warm-up failed")
+        finally:
+            close_old_connections()
+    threading.Thread(target=_run, name="rfid-index-warm", daemon=True).start()
+
+
+def _current():
+    if _version is None or _version != versions.current(_VERSION_KEY):
+        reload()
+
+
+def version_key():
+    return _VERSION_KEY
+
+
+def version():
+    """Shared version; moves on every teacher/student rfid, name or archive change."""
+    return versions.current(_VERSION_KEY)
+
+
+def _lookup(code):
+    """Single-row DB lookup for a sticker the index missed; adds it to the index."""
+    for kind, index, table, id_col in (("teacher", _teachers, "FACULTY", "faculty_id"),
+                                       ("student", _students, "STUDENTS", "student_id")):
+        rows = _load_rows(table, id_col, "AND rfid_sticker_id = %s", [code])
+        if rows:
+            entry = (rows[0][1], rows[0][2], rows[0][3])
+            with _lock:
+                index[code] = entry
+            return kind, entry
+    return None, None
+
+
+def resolve(rfid_code):
+    """('teacher'|'student', (id, first_name, last_name)) or (None, None)."""
+    code = str(rfid_code or "").strip()
+    if not code:
+        return None, None
+    _current()
+    with _lock:
+        if code in _teachers:
+            return "teacher", _teachers[code]
+        if code in _students:
+            return "student", _students[code]
+    return _lookup(code)
+
+
+def _patch(index, table, id_col, entity_id):
+    """Re-read one person's row and swap their entry in index."""
+    rows = _load_rows(table, id_col, f"AND {id_col} = %s", [entity_id])
+    with _lock:
+        for code, entry in list(index.items()):
+            if str(entry[0]) == str(entity_id):
+                del index[code]
+        for r in rows:
+            index[str(r[0]).strip()] = (r[1], r[2], r[3])
+
+
+def _changed(kind, entity_id):
+    global _version
+    with _lock:
+        old_version = _version
+        new_version = versions.bump(_VERSION_KEY)
+        if old_version is None or new_version != old_version + 1:
+            _version = None  # missed someone else's change: reload on the next tap
+            return
+        try:
+            if kind == "teacher":
+                _patch(_teachers, "FACULTY", "faculty_id", entity_id)
+            else:
+                _patch(_students, "STUDENTS", "student_id", entity_id)
+            _version = new_version
+        except Exception:
+            log.exception("RFID index patch failed for %s %s", kind, entity_id)
+            _version = None
+
+
+def teacher_changed(faculty_id):
+    """Call after any write to a FACULTY row's rfid/name/archive state (or its delete)."""
+    transaction.on_commit(lambda: _changed("teacher", faculty_id))
+
+
+def student_changed(student_id):
+    """Call after any write to a STUDENTS row's rfid/name/archive state (or its delete)."""
+    transaction.on_commit(lambda: _changed("student", student_id))
@@ -0,0 +1,92 @@
+# core/utils/schema.py
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+
+from . import versions
+
+log = logging.getLogger(__name__)
+
+
+# =========================
+# Schema capability registry
+# =========================
+# The views adapt to older databases (optional columns like is_active,
+# program_id, number_of_students...). Instead of asking INFORMATION_SCHEMA
+# on every request, read every table's columns once per process and answer
+# from memory. After a migration run `python manage.py refresh_schema`
+# (or restart): it bumps a version in the shared cache (settings.CACHES) so
+# workers reload within _CHECK_SECONDS; SCHEMA_REGISTRY_MAX_AGE reloads regardless.
+# A failed reload keeps the last good copy; with none yet, the error
+# propagates rather than reading as "table missing".
+# Names compare case-insensitively, like the SQL Server default collation.
+
+_VERSION_KEY = "schema:version"
+
+_lock = threading.Lock()
+_columns = None     # {TABLE: {COLUMN, ...}}
+_version = None
+_loaded_at = 0.0
+_next_check = 0.0   # until then probes answer from memory only
+
+_CHECK_SECONDS = 30  # a probe looks at the shared version at most this often
+
+
+def _max_age():
+    return float(getattr(settings, "SCHEMA_REGISTRY_MAX_AGE", 600))
+
+
+def _load():
+    global _columns, _version, _loaded_at, _next_check
+    version = versions.current(_VERSION_KEY)
+    cols = {}
+    with connection.cursor() as c:
+        c.execute("SELECT TABLE_NAME FROM INFORMATION_SCHEMA.TABLES")
+        for (table,) in c.fetchall():
+            cols.setdefault(table.upper(), set())
+        c.execute("SELECT TABLE_NAME, COLUMN_NAME FROM INFORMATION_SCHEMA.COLUMNS")
+        for table, column in c.fetchall():
+            cols.setdefault(table.upper(), set()).add(column.upper())
+    with _lock:
+        _columns, _version = cols, version
+        _loaded_at = time.monotonic()
+        _next_check = _loaded_at + _CHECK_SECONDS
+    log.info("Schema registry loaded: %s tables", len(cols))
+    return cols
+
+
+def _registry():
+    global _next_check
+    cols = _columns
+    now = time.monotonic()
+    if cols is not None and now < _next_check:
+        return cols     # most probes: memory only
+    if (cols is not None and now - _loaded_at < _max_age()
+            and _version == versions.current(_VERSION_KEY)):
+        _next_check = now + _CHECK_SECONDS
+        return cols
+    try:
+        return _load()
+    except Exception:
+        if cols is None:
+            raise
+        _next_check = now + _CHECK_SECONDS   # retry then, not on every probe
+        log.exception("Schema registry reload failed; keeping the last good copy")
+        return cols
+
+
+def has_table(table):
+    return str(table).upper() in _registry()
+
+
+def has_column(table, column):
+    return str(column).upper() in _registry().get(str(table).upper(), ())
+
+
+def refresh():
+    """Reload here and bump the shared version so running workers reload too."""
+    versions.bump(_VERSION_KEY)
+    return _load()
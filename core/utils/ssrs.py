@@ -0,0 +1,494 @@
+# core/utils/ssrs.py
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+from . import report_cache
+
+log = logging.getLogger(__name__)
+
+# ---------- keep-alive client (one per thread) ----------
+_local = threading.local()
+
+
+class SSRSClient:
+    """
+    Pooled requests.Session for one thread. NTLM authenticates the TCP
+    connection, so keeping it alive means later reports skip the handshake.
+    """
+
+    def __init__(self, headers, auth):
+        pool_size = max(1, int(getattr(settings, "SSRS_POOL_SIZE", 4)))
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update(headers or {})
+        self.session.auth = auth
+        self.session.verify = getattr(settings, "SSRS_VERIFY_TLS", False)
+        self.last_used = time.monotonic()
+
+    def get(self, url, timeout=60):
+        self.last_used = time.monotonic()
+        return self.session.get(url, timeout=timeout)
+
+    def close(self):
+        try:
+            self.session.close()
+        except Exception:
+            pass
+
+
+def get_client(make_auth):
+    """
+    This thread's SSRSClient, rebuilt after SSRS_SESSION_IDLE_TIMEOUT seconds
+    without use (the server drops idle keep-alives anyway).
+    make_auth is the views' _make_auth_headers_and_authobj.
+    """
+    client = getattr(_local, "client", None)
+    idle = float(getattr(settings, "SSRS_SESSION_IDLE_TIMEOUT", 120))
+    if client is not None and time.monotonic() - client.last_used > idle:
+        client.close()
+        client = None
+    if client is None:
+        headers, auth = make_auth()
+        client = _local.client = SSRSClient(headers, auth)
+    return client
+
+
+def reset_client():
+    """Drop this thread's client, e.g. after a connection error."""
+    client = getattr(_local, "client", None)
+    if client is not None:
+        client.close()
+        _local.client = None
+
+
+# ---------- per-host limit ----------
+_host_slots = {}
+_host_slots_lock = threading.Lock()
+
+
+def _host_slot(url):
+    """
+    One semaphore per report server host, shared by every request in this
+    process, so parallel exports can't pile more than SSRS_MAX_PER_HOST
+    renders on the same server. Held per HTTP request (_attempt), so hedged
+    duplicates count against it too and retry backoff doesn't.
+    """
+    host = urlsplit(url or "").netloc.lower()
+    with _host_slots_lock:
+        slot = _host_slots.get(host)
+        if slot is None:
+            limit = max(1, int(getattr(settings, "SSRS_MAX_PER_HOST", 4)))
+            slot = _host_slots[host] = threading.BoundedSemaphore(limit)
+        return slot
+
+
+# ---------- circuit breaker (one per report server host) ----------
+class SSRSUnavailable(requests.HTTPError):
+    """Raised without calling SSRS while the host's breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    closed -> open after SSRS_BREAKER_THRESHOLD failures in a row (5xx,
+    timeout, connection error). While open every call fails fast; after
+    SSRS_BREAKER_COOLDOWN seconds one probe is let through (half-open) and
+    its result closes or re-opens the breaker.
+    """
+
+    def __init__(self, host):
+        self.host = host
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.opened_count = 0
+        self.lock = threading.Lock()
+
+    def _cooldown(self):
+        return float(getattr(settings, "SSRS_BREAKER_COOLDOWN", 30))
+
+    def state(self):
+        with self.lock:
+            if self.opened_at is None:
+                return "closed"
+            if self.probing or time.monotonic() - self.opened_at >= self._cooldown():
+                return "half-open"
+            return "open"
+
+    def allow(self):
+        """True to go ahead, "probe" when this call is the half-open probe, False to fail fast."""
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if self.probing or time.monotonic() - self.opened_at < self._cooldown():
+                return False
+            self.probing = True
+            return "probe"
+
+    def end_probe(self):
+        """The probe ended without success()/failure() (an unexpected error): allow the next one."""
+        with self.lock:
+            self.probing = False
+
+    def success(self):
+        with self.lock:
+            if self.opened_at is not None:
+                log.info("SSRS breaker for %s closed", self.host)
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def failure(self):
+        threshold = max(1, int(getattr(settings, "SSRS_BREAKER_THRESHOLD", 5)))
+        with self.lock:
+            self.failures += 1
+            if self.probing or (self.opened_at is None and self.failures >= threshold):
+                if not self.probing:
+                    self.opened_count += 1
+                log.warning("SSRS breaker for %s open after %s failures", self.host, self.failures)
+                self.opened_at = time.monotonic()
+            self.probing = False
+
+    def snapshot(self):
+        state = self.state()
+        with self.lock:
+            return {
+                "state": state,
+                "consecutive_failures": self.failures,
+                "times_opened": self.opened_count,
+                "open_for_s": round(time.monotonic() - self.opened_at, 1) if self.opened_at else None,
+            }
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def _breaker(url):
+    host = urlsplit(url or "").netloc.lower()
+    with _breakers_lock:
+        b = _breakers.get(host)
+        if b is None:
+            b = _breakers[host] = CircuitBreaker(host)
+        return b
+
+
+# ---------- per-report counters ----------
+class _PathStats:
+    """Request/error counters and a rolling latency window for one report path."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = dict.fromkeys(
+            ("requests", "ok", "errors", "timeouts", "retries",
+             "hedged", "hedge_wins", "short_circuited"), 0)
+        self.latencies = deque(maxlen=max(10, int(getattr(settings, "SSRS_LATENCY_SAMPLES", 200))))
+        self.last_error = None
+        self.last_error_at = None
+
+    def bump(self, key):
+        with self.lock:
+            self.counts[key] += 1
+
+    def record(self, elapsed, error=None, timeout=False):
+        with self.lock:
+            self.counts["requests"] += 1
+            if error is None:
+                self.counts["ok"] += 1
+                self.latencies.append(elapsed)
+                return
+            self.counts["errors"] += 1
+            if timeout:
+                self.counts["timeouts"] += 1
+            self.last_error = str(error)[:300]
+            self.last_error_at = time.time()
+
+    def percentile(self, pct, min_samples=1):
+        with self.lock:
+            data = sorted(self.latencies)
+        if len(data) < min_samples or not data:
+            return None
+        i = min(len(data) - 1, int(round(pct / 100.0 * (len(data) - 1))))
+        return data[i]
+
+    def snapshot(self):
+        p50, p95, p99 = (self.percentile(p) for p in (50, 95, 99))
+        with self.lock:
+            out = dict(self.counts)
+            out.update({
+                "samples": len(self.latencies),
+                "p50_ms": round(p50 * 1000) if p50 is not None else None,
+                "p95_ms": round(p95 * 1000) if p95 is not None else None,
+                "p99_ms": round(p99 * 1000) if p99 is not None else None,
+                "last_error": self.last_error,
+                "last_error_at": self.last_error_at,
+            })
+            return out
+
+
+_path_stats = {}
+_path_stats_lock = threading.Lock()
+
+
+def _stats_for(report_path):
+    with _path_stats_lock:
+        st = _path_stats.get(report_path)
+        if st is None:
+            st = _path_stats[report_path] = _PathStats()
+        return st
+
+
+def stats():
+    """Breaker state per host and counters/latency per report path (this process)."""
+    with _breakers_lock:
+        breakers = dict(_breakers)
+    with _path_stats_lock:
+        paths = dict(_path_stats)
+    return {
+        "breakers": {host: b.snapshot() for host, b in breakers.items()},
+        "reports": {path: st.snapshot() for path, st in paths.items()},
+    }
+
+
+# ---------- guarded fetch (retries + hedging) ----------
+class _Retryable(Exception):
+    def __init__(self, error):
+        super().__init__(str(error))
+        self.error = error
+
+
+def _attempt(url, report_path, make_auth, timeout, breaker, st):
+    """One GET. PDF bytes, _Retryable for 5xx/network errors, HTTPError for the rest."""
+    slot = _host_slot(url)
+    if not slot.acquire(timeout=timeout):
+        err = requests.HTTPError(f"SSRS busy: no free slot within {timeout:.0f}s for {url}")
+        st.record(timeout, err, timeout=True)
+        raise _Retryable(err)
+    started = time.monotonic()
+    try:
+        r = get_client(make_auth).get(url, timeout=timeout)
+    except requests.RequestException as ex:
+        reset_client()
+        timed_out = isinstance(ex, requests.Timeout)
+        err = requests.HTTPError(
+            f"SSRS timed out after {timeout:.0f}s for {url}" if timed_out
+            else f"SSRS request failed for {url}\n{ex}"
+        )
+        err.__cause__ = ex
+        breaker.failure()
+        st.record(time.monotonic() - started, err, timeout=timed_out)
+        log.warning("SSRS %s failed: %s", report_path, ex)
+        raise _Retryable(err)
+    finally:
+        slot.release()
+
+    elapsed = time.monotonic() - started
+    if r.status_code == 200:
+        breaker.success()
+        st.record(elapsed)
+        return r.content
+
+    err = requests.HTTPError(f"{r.status_code} {r.reason} for {url}\n\n{r.text[:4000]}")
+    st.record(elapsed, err)
+    log.warning("SSRS %s returned %s %s: %s", report_path, r.status_code, r.reason, r.text[:1500])
+    if r.status_code >= 500:
+        breaker.failure()
+        raise _Retryable(err)
+    breaker.success()  # server answered; the request itself is bad, don't retry
+    raise err
+
+
+_hedge_pool = None
+
+
+def _hedge_executor():
+    global _hedge_pool
+    with _pool_lock:
+        if _hedge_pool is None:
+            workers = max(2, int(getattr(settings, "SSRS_MAX_PER_HOST", 4)) * 2)
+            _hedge_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ssrs-hedge")
+        return _hedge_pool
+
+
+def _hedge_delay(st, timeout):
+    pct = float(getattr(settings, "SSRS_HEDGE_PERCENTILE", 0) or 0)
+    if pct <= 0:
+        return None
+    after = st.percentile(pct, min_samples=20)
+    return after if after is not None and after < timeout else None
+
+
+def _hedged(url, report_path, make_auth, timeout, breaker, st):
+    """
+    One try, plus a second identical request if the first is still running
+    after the report's SSRS_HEDGE_PERCENTILE latency. First success wins; the
+    loser runs out on its own timeout in the background.
+    """
+    after = _hedge_delay(st, timeout)
+    if after is None:
+        return _attempt(url, report_path, make_auth, timeout, breaker, st)
+
+    end = time.monotonic() + timeout
+    pool = _hedge_executor()
+    first = pool.submit(_attempt, url, report_path, make_auth, timeout, breaker, st)
+    done, _ = wait([first], timeout=after)
+    if done:
+        return first.result()
+
+    st.bump("hedged")
+    second = pool.submit(_attempt, url, report_path, make_auth,
+                         max(1.0, end - time.monotonic()), breaker, st)
+    pending, error = {first, second}, None
+    while pending:
+        done, pending = wait(pending, timeout=max(0.0, end - time.monotonic()),
+                             return_when=FIRST_COMPLETED)
+        if not done:
+            break
+        for f in done:
+            try:
+                pdf = f.result()
+            except _Retryable as e:
+                error = e
+                continue
+            if f is second:
+                st.bump("hedge_wins")
+            return pdf
+    if error is not None:
+        raise error
+    raise _Retryable(requests.HTTPError(f"SSRS timed out after {timeout:.0f}s for {url}"))
+
+
+def fetch_pdf(url, report_path, make_auth, timeout=None):
+    """
+    GET a rendered report with the resilience rules around it:
+      - fail fast (SSRSUnavailable) while the host's breaker is open
+      - up to SSRS_RETRIES retries on 5xx/network errors, full-jitter
+        exponential backoff from SSRS_RETRY_BACKOFF seconds
+      - optional hedged request (see _hedged)
+      - never spends more than SSRS_DEADLINE seconds in total
+    4xx answers are raised straight away. Errors are requests.HTTPError.
+    """
+    breaker = _breaker(url)
+    st = _stats_for(report_path)
+    allowed = breaker.allow()
+    if not allowed:
+        st.bump("short_circuited")
+        raise SSRSUnavailable(f"Report server {breaker.host} is unavailable right now; try again shortly.")
+    try:
+        return _fetch_with_retries(url, report_path, make_auth, timeout, breaker, st)
+    finally:
+        if allowed == "probe":
+            breaker.end_probe()
+
+
+def _fetch_with_retries(url, report_path, make_auth, timeout, breaker, st):
+    timeout = float(timeout or getattr(settings, "SSRS_TIMEOUT", 30))
+    deadline = time.monotonic() + float(getattr(settings, "SSRS_DEADLINE", 45))
+    retries = max(0, int(getattr(settings, "SSRS_RETRIES", 2)))
+    base = float(getattr(settings, "SSRS_RETRY_BACKOFF", 0.5))
+
+    attempt = 0
+    while True:
+        remaining = deadline - time.monotonic()
+        try:
+            return _hedged(url, report_path, make_auth, min(timeout, max(1.0, remaining)), breaker, st)
+        except _Retryable as e:
+            error = e.error
+
+        attempt += 1
+        delay = random.uniform(0, min(10.0, base * (2 ** attempt)))
+        if (attempt > retries or breaker.state() != "closed"
+                or time.monotonic() + delay + 1.0 >= deadline):
+            raise error
+        st.bump("retries")
+        time.sleep(delay)
+
+
+# ---------- render jobs ----------
+def report_jobs(ids, t):
+    """
+    (filename, report_path, params, uid) for every PDF needed, in the same
+    order as ids. t is all|both|utilization|attendance (admin uses 'all', teacher 'both').
+    """
+    jobs = []
+    for uid in ids:
+        if t in ("all", "both", "utilization"):
+            jobs.append((
+                f"UtilizationSlip_{uid}.pdf",
+                settings.SSRS_UTILIZATION_REPORT_PATH,
+                {settings.SSRS_UTIL_PARAM_NAME: uid},
+                uid,
+            ))
+        if t in ("all", "both", "attendance"):
+            jobs.append((
+                f"AttendanceSheet_{uid}.pdf",
+                settings.SSRS_ATTENDANCE_REPORT_PATH,
+                {settings.SSRS_ATTEND_PARAM_NAME: uid},
+                uid,
+            ))
+    return jobs
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def render_pool():
+    # long-lived so each worker thread keeps its SSRSClient between exports
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            workers = max(1, int(getattr(settings, "SSRS_RENDER_WORKERS", 4)))
+            _pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ssrs-render")
+        return _pool
+
+
+def _job_runner(fetch, versions):
+    versions = versions or {}
+
+    def _one(job):
+        # SSRS requests take the per-host slot themselves (ssrs._attempt)
+        _, report_path, params, uid = job
+        return report_cache.get_or_render(
+            report_path, uid, versions.get(uid),
+            lambda: fetch(report_path, params),
+        )
+    return _one
+
+
+def iter_render(jobs, fetch, versions=None):
+    """
+    Yield each job's PDF bytes in job order while keeping only a small window
+    (2x SSRS_RENDER_WORKERS) in flight, so memory stays flat for big exports.
+    versions ({uid: version} from report_cache.slip_versions) lets cached PDFs
+    skip SSRS entirely. The first failure (in job order) is raised and
+    anything not started yet is cancelled.
+    """
+    one = _job_runner(fetch, versions)
+    window = max(1, int(getattr(settings, "SSRS_RENDER_WORKERS", 4))) * 2
+    pending = deque()
+    try:
+        for job in jobs:
+            pending.append(render_pool().submit(one, job))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for f in pending:
+            f.cancel()
+
+
+def render_one(job, fetch, versions=None):
+    """A single report_jobs entry: cache first, then SSRS under the host slot."""
+    return _job_runner(fetch, versions)(job)
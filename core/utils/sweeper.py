@@ -0,0 +1,116 @@
+# core/utils/sweeper.py
+import logging
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from . import attendance_previews, live, prerender, timetable
+
+log = logging.getLogger(__name__)
+
+
+# =========================
+# Overdue session sweeper
+# =========================
+# Completes 'Active' slips whose end time has passed, on a fixed cadence,
+# instead of on every tap/poll. Two set-based statements per sweep, then
+# one active_sessions push per affected lab.
+#   SESSION_SWEEPER = "thread"  -> in-process timer, started on the first request
+#   SESSION_SWEEPER = "command" -> run `manage.py sweep_sessions --loop` instead
+#                                  (needs a shared settings.CACHES: the web
+#                                  workers learn of completions through it)
+# Running more than one sweeper is harmless: a slip only completes once,
+# and only the sweep that completed it pushes/enqueues it.
+
+_started = False
+_start_lock = threading.Lock()
+
+
+def _default_fetch():
+    from core.views import _ssrs_pdf  # views import this module; resolve lazily
+    return _ssrs_pdf
+
+
+def sweep(now=None, fetch=None):
+    """Complete every due session. Returns [(utilization_id, lab_id, requested_by), ...] it completed."""
+    now = now or timezone.localtime()
+    today, now_t = now.date(), now.time()
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            # students still inside -> tapped out at the slip's end time
+            cursor.execute("""
+                UPDATE cla
+                   SET time_out = COALESCE(u.end_time, %s)
+                  FROM COMPUTER_LAB_ATTENDANCE AS cla
+                  JOIN UTILIZATION_SLIP       AS u
+                    ON u.utilization_id = cla.utilization_id
+                 WHERE u.status = 'Active'
+                   AND (u.date < %s OR (u.date = %s AND u.end_time < %s))
+                   AND cla.time_out IS NULL
+            """, [now_t, today, today, now_t])
+
+            cursor.execute("""
+                UPDATE UTILIZATION_SLIP
+                   SET status = 'Completed',
+                       time_duration = CASE
+                           WHEN start_time IS NOT NULL AND end_time IS NOT NULL
+                           THEN CONVERT(varchar(8), DATEADD(SECOND, DATEDIFF(SECOND, start_time, end_time), 0), 108)
+                           ELSE NULL END
+                OUTPUT INSERTED.utilization_id, INSERTED.lab_id, INSERTED.requested_by
+                 WHERE status = 'Active'
+                   AND (date < %s OR (date = %s AND end_time < %s))
+            """, [today, today, now_t])
+            done = cursor.fetchall()
+
+    if not done:
+        return []
+
+    from teacher.realtime import realtime
+    for lab_id in sorted({lab_id for _, lab_id, _ in done if lab_id}):
+        timetable.lab_changed(lab_id)
+        try:
+            realtime.push_active_sessions(lab_id)
+        except Exception as e:
+            log.warning("active_sessions push failed for lab %s: %s", lab_id, e)
+
+    for teacher_id in {fid for _, _, fid in done if fid}:
+        live.publish(f"teacher-{teacher_id}", "session", {"status": "Completed"})
+
+    ids = [uid for uid, _, _ in done]
+    attendance_previews.changed(ids)
+    prerender.enqueue(ids, fetch or _default_fetch())
+    log.info("Completed %s overdue session(s)", len(ids))
+    return done
+
+
+def _interval():
+    return max(5.0, float(getattr(settings, "SESSION_SWEEP_SECONDS", 30)))
+
+
+def run_forever(stop=None):
+    """Sweep every SESSION_SWEEP_SECONDS until stop (a threading.Event) is set."""
+    stop = stop or threading.Event()
+    while not stop.is_set():
+        close_old_connections()
+        try:
+            sweep()
+        except Exception:
+            log.exception("Session sweep failed")
+        finally:
+            close_old_connections()
+        stop.wait(_interval())
+
+
+def start():
+    """Start the in-process sweeper once per process (SESSION_SWEEPER='thread')."""
+    global _started
+    if str(getattr(settings, "SESSION_SWEEPER", "thread")).lower() != "thread":
+        return
+    with _start_lock:
+        if _started:
+            return
+        _started = True
+    threading.Thread(target=run_forever, name="session-sweeper", daemon=True).start()
@@ -0,0 +1,78 @@
+# core/utils/tap_dedup.py
+import threading
+import time
+
+from django.conf import settings
+
+
+# =========================
+# Tap de-duplication / idempotency window
+# =========================
+# Readers often report one card twice in a row, and a reader retrying after
+# a timeout sends the same tap again. run(key, fn, ttl) runs fn() for the
+# first call with key and hands that same result to every repeat for ttl
+# seconds, so a double read can't turn a tap-in into a tap-out. A repeat
+# that arrives while the first is still running waits for its result.
+# In-memory and per worker process; failed runs (exceptions) aren't kept.
+
+_lock = threading.Lock()
+_entries = {}        # key -> _Entry
+_next_prune = 0.0
+
+
+class _Entry:
+    __slots__ = ("done", "result", "expires")
+
+    def __init__(self, expires):
+        self.done = threading.Event()
+        self.result = None
+        self.expires = expires
+
+
+def tap_window():
+    return float(getattr(settings, "RFID_DEDUP_SECONDS", 3))
+
+
+def idempotency_window():
+    return float(getattr(settings, "RFID_IDEMPOTENCY_SECONDS", 600))
+
+
+def _prune(now):
+    global _next_prune
+    if now < _next_prune:
+        return
+    for k in [k for k, e in _entries.items() if e.expires <= now and e.done.is_set()]:
+        del _entries[k]
+    _next_prune = now + 30
+
+
+def run(key, fn, ttl):
+    """(result, replayed): fn()'s result, or the first call's result if key was seen within ttl."""
+    if ttl <= 0:
+        return fn(), False
+
+    now = time.monotonic()
+    with _lock:
+        _prune(now)
+        entry = _entries.get(key)
+        if entry is not None and entry.expires > now:
+            owner = False
+        else:
+            entry = _entries[key] = _Entry(now + ttl)
+            owner = True
+
+    if not owner:
+        if entry.done.wait(30) and entry.result is not None:
+            return entry.result, True
+        return fn(), False  # first run failed or hung: do it ourselves
+
+    try:
+        entry.result = fn()
+    except Exception:
+        with _lock:
+            if _entries.get(key) is entry:
+                del _entries[key]
+        raise
+    finally:
+        entry.done.set()
+    return entry.result, False
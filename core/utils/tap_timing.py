@@ -0,0 +1,99 @@
+# core/utils/tap_timing.py
+import logging
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+
+log = logging.getLogger(__name__)
+
+
+# =========================
+# RFID tap timing (per stage, per lab)
+# =========================
+# A lap timer for the single-tap path: begin() when the tap starts, mark()
+# after each stage (the time since the previous mark goes to that stage),
+# end() when it's answered. Rolling windows of the last RFID_TIMING_SAMPLES
+# taps per (lab, stage) give p50/p95/p99; taps slower than RFID_SLOW_TAP_MS
+# are logged with their breakdown. mark() outside a tap (batch flushes,
+# sweeper) is a no-op. Per worker process, reset on restart.
+#   identity -> rfid_index lookup       reader -> reader -> lab
+#   schedule -> timetable match         db     -> slip/attendance reads+writes
+#   push     -> active-sessions query + outbox
+
+_local = threading.local()
+_lock = threading.Lock()
+_windows = {}   # (lab, stage) -> deque of seconds; lab "all" = every lab
+
+
+class _Trace:
+    __slots__ = ("started", "last", "laps", "lab")
+
+    def __init__(self):
+        self.started = self.last = time.perf_counter()
+        self.laps = {}
+        self.lab = None
+
+
+def begin():
+    _local.trace = _Trace()
+
+
+def mark(stage):
+    tr = getattr(_local, "trace", None)
+    if tr is None:
+        return
+    now = time.perf_counter()
+    tr.laps[stage] = tr.laps.get(stage, 0.0) + (now - tr.last)
+    tr.last = now
+
+
+def set_lab(lab_num):
+    tr = getattr(_local, "trace", None)
+    if tr is not None:
+        tr.lab = lab_num
+
+
+def end():
+    tr = getattr(_local, "trace", None)
+    _local.trace = None
+    if tr is None:
+        return
+    laps = dict(tr.laps, total=time.perf_counter() - tr.started)
+    lab = str(tr.lab) if tr.lab is not None else "unknown"
+    samples = max(10, int(getattr(settings, "RFID_TIMING_SAMPLES", 500)))
+
+    with _lock:
+        for scope in ("all", lab):
+            for stage, secs in laps.items():
+                win = _windows.get((scope, stage))
+                if win is None:
+                    win = _windows[(scope, stage)] = deque(maxlen=samples)
+                win.append(secs)
+
+    slow_ms = float(getattr(settings, "RFID_SLOW_TAP_MS", 500))
+    if slow_ms and laps["total"] * 1000 >= slow_ms:
+        log.warning("Slow RFID tap (%.0f ms) in lab %s: %s", laps["total"] * 1000, lab,
+                    ", ".join(f"{s}={v * 1000:.0f}ms" for s, v in laps.items() if s != "total"))
+
+
+def _pct(data, pct):
+    i = min(len(data) - 1, int(round(pct / 100.0 * (len(data) - 1))))
+    return round(data[i] * 1000, 1)
+
+
+def stats():
+    """{"all": {stage: {...}}, "labs": {lab_num: {stage: {...}}}} in milliseconds."""
+    with _lock:
+        windows = {k: sorted(v) for k, v in _windows.items()}
+    out = {"all": {}, "labs": {}}
+    for (scope, stage), data in sorted(windows.items()):
+        if not data:
+            continue
+        row = {"count": len(data), "p50_ms": _pct(data, 50), "p95_ms": _pct(data, 95), "p99_ms": _pct(data, 99)}
+        if scope == "all":
+            out["all"][stage] = row
+        else:
+            out["labs"].setdefault(scope, {})[stage] = row
+    return out
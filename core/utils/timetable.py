@@ -0,0 +1,163 @@
+# core/utils/timetable.py
+import threading
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import versions
+
+
+# =========================
+# Per-lab daily timetable (tap matching)
+# =========================
+# For each (lab, date) we keep that day's LAB_SCHEDULE rows, indexed per
+# teacher, and the lab's Active slips, each in an interval index, so a tap
+# finds its schedule/session with two bisects instead of a query.
+#   lab_changed(lab_id) -> that lab's schedules or slips changed
+#   changed_all()       -> something every lab depends on changed
+#                          (teacher archived, assignment deleted, ...)
+# Both bump shared versions (settings.CACHES), so other workers rebuild
+# too. A lookup that finds nothing rebuilds the day from the DB once before
+# giving up, so a tap is never rejected on a copy that missed a change.
+# Days are keyed by date, which is all the midnight rollover needs; old
+# days are dropped.
+
+EARLY_MINUTES = 10        # teachers may tap in this long before start_time
+STUDENT_LATE_MINUTES = 0  # students may still tap this long after end_time
+
+_ALL_KEY = "timetable:version"
+_lock = threading.Lock()
+_days = {}   # (lab_id, date) -> (versions, _Day)
+
+
+def _lab_key(lab_id):
+    return f"timetable:lab:{lab_id}"
+
+
+def _secs(t):
+    return t.hour * 3600 + t.minute * 60 + t.second + t.microsecond / 1e6
+
+
+class _Intervals:
+    """
+    Intervals sorted by start. find(t) returns the earliest-starting one
+    that covers t: opens[] is sorted, and the running max of the closes is
+    non-decreasing, so both edges are a bisect.
+    """
+
+    def __init__(self, items):
+        # items: (open_s, start_s, close_s, row)
+        self.items = sorted(items, key=lambda x: (x[1], x[2]))
+        self.opens = [x[0] for x in self.items]
+        self.max_close = []
+        top = float("-inf")
+        for x in self.items:
+            top = max(top, x[2])
+            self.max_close.append(top)
+
+    def find(self, t):
+        k = bisect_right(self.opens, t)             # opened at or before t
+        j = bisect_left(self.max_close, t)          # first one still open at t
+        return self.items[j][3] if j < k else None
+
+
+class _Day:
+    def __init__(self, schedules, sessions):
+        early = EARLY_MINUTES * 60
+        by_teacher = defaultdict(list)
+        for row in schedules:
+            _sid, st, et, _atid, reserved_to, at_faculty = row
+            if st is None or et is None:
+                continue
+            s = _secs(st)
+            item = (max(0.0, s - early), s, _secs(et), row)
+            for fid in {reserved_to, at_faculty} - {None}:
+                by_teacher[fid].append(item)
+        self.schedules = {fid: _Intervals(items) for fid, items in by_teacher.items()}
+
+        late = STUDENT_LATE_MINUTES * 60
+        self.sessions = _Intervals([
+            (_secs(row[2]), _secs(row[2]), _secs(row[3]) + late, row)
+            for row in sessions if row[2] is not None and row[3] is not None
+        ])
+
+
+def _build(lab_id, day):
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT s.schedule_id, s.start_time, s.end_time, s.assigned_teacher_id,
+                   s.reserved_to, at.faculty_id AS at_faculty_id
+              FROM LAB_SCHEDULE AS s
+              LEFT JOIN ASSIGNED_TEACHER AS at
+                     ON at.assigned_teacher_id = s.assigned_teacher_id
+             WHERE s.lab_id = %s AND s.date = %s
+        """, [lab_id, day])
+        schedules = cursor.fetchall()
+
+        cursor.execute("""
+            SELECT utilization_id, date, start_time, end_time, requested_by
+              FROM UTILIZATION_SLIP
+             WHERE lab_id = %s AND date = %s AND status = 'Active'
+        """, [lab_id, day])
+        sessions = cursor.fetchall()
+    return _Day(schedules, sessions)
+
+
+def _day(lab_id, day, fresh=False):
+    ver = versions.current_many(version_keys(lab_id))
+    key = (lab_id, day)
+    with _lock:
+        hit = _days.get(key)
+    if not fresh and hit is not None and hit[0] == ver:
+        return hit[1]
+
+    tt = _build(lab_id, day)
+    oldest = timezone.localdate() - timedelta(days=1)  # keep yesterday for late batch flushes
+    with _lock:
+        _days[key] = (ver, tt)
+        for k in [k for k in _days if k[1] < oldest]:
+            del _days[k]
+    return tt
+
+
+def teacher_schedule(lab_id, day, teacher_id, at_time):
+    """
+    The LAB_SCHEDULE row this teacher can tap into at at_time (from
+    EARLY_MINUTES before start until end), earliest start first:
+    (schedule_id, start_time, end_time, assigned_teacher_id, reserved_to, at_faculty_id).
+    """
+    for fresh in (False, True):
+        idx = _day(lab_id, day, fresh).schedules.get(teacher_id)
+        row = idx.find(_secs(at_time)) if idx else None
+        if row:
+            return row
+    return None
+
+
+def active_session(lab_id, day, at_time):
+    """The Active slip covering at_time: (utilization_id, date, start_time, end_time, requested_by)."""
+    return (_day(lab_id, day).sessions.find(_secs(at_time))
+            or _day(lab_id, day, fresh=True).sessions.find(_secs(at_time)))
+
+
+def version_keys(lab_id):
+    """Shared counters behind version(lab_id), for callers that read several modules' at once."""
+    return [_ALL_KEY] if lab_id is None else [_ALL_KEY, _lab_key(lab_id)]
+
+
+def version(lab_id):
+    """(all-labs version, this lab's version); moves on every change above."""
+    vals = versions.current_many(version_keys(lab_id))
+    return vals[0], (vals[1] if lab_id is not None else None)
+
+
+def lab_changed(lab_id):
+    if lab_id is not None:
+        transaction.on_commit(lambda: versions.bump(_lab_key(lab_id)))
+
+
+def changed_all():
+    transaction.on_commit(lambda: versions.bump(_ALL_KEY))
@@ -0,0 +1,83 @@
+# core/utils/versions.py
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+# ---------- shared version counters ----------
+# Small integers that process-local caches compare against: whoever changes
+# the data bumps the counter, every worker holding an older number rebuilds
+# on its next read. They live in their own cache alias, "versions" (see
+# settings.CACHES): a shared backend with an atomic incr, so two writers
+# never get the same number, and no expiry, so payload keys can't push
+# them out. A counter that vanished anyway restarts from the clock, never
+# from a number some cached entry still has.
+# Reads are kept in this process for VERSION_CHECK_SECONDS, so hot paths
+# (a tap, a 304) answer from memory; a bump made here is seen here at once,
+# other workers' bumps within that interval.
+
+_ALIAS = "versions"
+
+_lock = threading.Lock()
+_local = {}     # key -> (value, read_at)
+
+
+def _cache():
+    return caches[_ALIAS] if _ALIAS in getattr(settings, "CACHES", {}) else caches["default"]
+
+
+def _check_seconds():
+    return float(getattr(settings, "VERSION_CHECK_SECONDS", 1))
+
+
+def shared():
+    """False when the counters' cache is per process (LocMemCache/DummyCache)."""
+    aliases = getattr(settings, "CACHES", {})
+    conf = aliases.get(_ALIAS) or aliases.get("default", {})
+    backend = conf.get("BACKEND", "django.core.cache.backends.locmem.LocMemCache")
+    return not backend.endswith(("locmem.LocMemCache", "dummy.DummyCache"))
+
+
+def current_many(keys):
+    """Current values of keys, in order; one cache read for the ones not held locally."""
+    now = time.monotonic()
+    fresh_for = _check_seconds()
+    values, missing = {}, []
+    with _lock:
+        for key in keys:
+            hit = _local.get(key)
+            if hit is not None and now - hit[1] < fresh_for:
+                values[key] = hit[0]
+            else:
+                missing.append(key)
+
+    if missing:
+        cache = _cache()
+        got = cache.get_many(missing)
+        for key in missing:
+            if key not in got:
+                cache.add(key, time.time_ns(), None)
+                got[key] = cache.get(key, 1)
+        with _lock:
+            for key in missing:
+                _local[key] = (got[key], now)
+        values.update(got)
+    return tuple(values[key] for key in keys)
+
+
+def current(key):
+    return current_many([key])[0]
+
+
+def bump(key):
+    cache = _cache()
+    try:
+        value = cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), None)
+        value = cache.incr(key)
+    with _lock:
+        _local[key] = (value, time.monotonic())
+    return value
@@ -0,0 +1,135 @@
+# core/utils/week_grid.py
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from . import readers, versions
+
+
+# =========================
+# Week-grid cache (admin_week_data / lab_week_data / admin_campus_week_data)
+# =========================
+# The built grid payload per (view, lab, week, include_requests, mine),
+# in the Django cache. Keys carry three versions, so a write only drops
+# the grids it can change:
+#   changed(lab_id, first, last) -> schedules/requests of that lab on those
+#                                   dates (their weeks); no dates = whole lab
+#   changed_all()                -> teacher/assignment edits any grid shows
+#   hours_changed()              -> OPERATING_TIME edits (campus week only)
+# The campus week (every lab at once) has its own per-week version that
+# every changed() of any lab bumps too, plus the reader registry's version
+# for labs added, renamed or archived.
+# WEEK_GRID_TTL bounds what nothing bumps (course or lab renames).
+# Payloads live in the shared cache; each process also keeps the grids it
+# served last (same versioned key) for WEEK_GRID_LOCAL_SECONDS, so a hot
+# grid costs no round trip at all: the versions are read from memory too
+# (VERSION_CHECK_SECONDS). With a per-process cache a write on one worker
+# can't reach the others, so grids are built on every request instead.
+
+_ALL_KEY = "week_grid:version"
+_CAMPUS_KEY = "week_grid:campus"
+_LOCAL_MAX = 256
+
+_local_lock = threading.Lock()
+_local = OrderedDict()    # versioned key -> (payload, stored_at), oldest first
+
+
+def _monday(d):
+    return d - timedelta(days=d.weekday())
+
+
+def _lab_key(lab_id):
+    return f"week_grid:lab:{lab_id}"
+
+
+def _week_key(lab_id, monday):
+    return f"week_grid:lab:{lab_id}:{monday.isoformat()}"
+
+
+def _campus_week_key(monday):
+    return f"week_grid:campus:{monday.isoformat()}"
+
+
+def _ttl():
+    return int(getattr(settings, "WEEK_GRID_TTL", 600))
+
+
+def _cached(key, build):
+    """This process's copy, else the shared cache, else build() stored in both."""
+    now = time.monotonic()
+    with _local_lock:
+        hit = _local.get(key)
+    if hit is not None and now - hit[1] < float(getattr(settings, "WEEK_GRID_LOCAL_SECONDS", 30)):
+        return hit[0]
+
+    payload = cache.get(key)
+    if payload is None:
+        payload = build()
+        cache.set(key, payload, _ttl())
+    with _local_lock:
+        _local[key] = (payload, now)
+        _local.move_to_end(key)
+        while len(_local) > _LOCAL_MAX:
+            _local.popitem(last=False)
+    return payload
+
+
+def version(lab_id, week_day):
+    """Versions a grid of lab_id for the week containing week_day depends on."""
+    return versions.current_many([_ALL_KEY, _lab_key(lab_id), _week_key(lab_id, _monday(week_day))])
+
+
+def get_or_build(view, lab_id, week_day, include_requests, mine, build):
+    """Cached payload, or build() stored under the current versions."""
+    if not versions.shared():
+        return build()
+    v_all, v_lab, v_week = version(lab_id, week_day)
+    key = (f"week_grid:{view}:{lab_id}:{_monday(week_day).isoformat()}:"
+           f"{int(bool(include_requests))}:{mine or 0}:{v_all}:{v_lab}:{v_week}")
+    return _cached(key, build)
+
+
+def campus_version(week_day):
+    """Versions the every-lab grid for the week containing week_day depends on."""
+    return versions.current_many([_ALL_KEY, _CAMPUS_KEY, _campus_week_key(_monday(week_day)),
+                                  readers.version_key()])
+
+
+def get_or_build_campus(week_day, build):
+    """Cached campus week payload, or build() stored under the current versions."""
+    if not versions.shared():
+        return build()
+    key = "week_grid:campus:{}:{}:{}:{}:{}".format(_monday(week_day).isoformat(), *campus_version(week_day))
+    return _cached(key, build)
+
+
+def changed(lab_id, first=None, last=None):
+    """After a write to lab_id's schedules/requests dated first..last (None = any date)."""
+    if lab_id is None:
+        return
+    if first is None:
+        keys = [_lab_key(lab_id), _CAMPUS_KEY]
+    else:
+        monday, end = _monday(first), _monday(last or first)
+        keys = []
+        while monday <= end:
+            keys += [_week_key(lab_id, monday), _campus_week_key(monday)]
+            monday += timedelta(days=7)
+
+    def _bump():
+        for k in keys:
+            versions.bump(k)
+    transaction.on_commit(_bump)
+
+
+def changed_all():
+    transaction.on_commit(lambda: versions.bump(_ALL_KEY))
+
+
+def hours_changed():
+    transaction.on_commit(lambda: versions.bump(_CAMPUS_KEY))
@@ -19,6 +19,7 @@ from datetime import date as ddate, datetime as dt
 import core.utils.mailers
 from django.db import connection, transaction
 from django.utils.http import url_has_allowed_host_and_scheme
+from django.utils.dateparse import parse_datetime
 from django.views.decorators.http import require_http_methods
 from django.utils.html import strip_spaces_between_tags as minify_html
 from django.template.loader import render_to_string
@@ -28,19 +29,25 @@ import io, zipfile, datetime, base64
 from teacher import realtime
 from .forms import SiteSettingForm
 from .utils.roles import is_admin_role
+from .utils.ssrs import report_jobs, iter_render, fetch_pdf
+from .utils import ssrs
+from .utils.exports import primed, zip_stream, merge_pdfs, ranged_file_response, too_many_to_merge, zip_download
+from .utils import active_sessions, attendance_previews, etags, export_jobs, local_reports, prerender, readers, live, offload, rfid_index, schema, tap_dedup, tap_timing, timetable, week_grid
+from .utils.report_cache import slip_versions, get_or_render
 
 
 from django.contrib import messages
 from django.contrib.auth.hashers import make_password, check_password
 from django.db import IntegrityError, connection
-from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseNotAllowed, JsonResponse
+from django.http import FileResponse, HttpResponse, HttpResponseBadRequest, HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect
 from django.contrib.auth import logout
 from django.views.decorators.csrf import csrf_exempt
 from django.core.mail import send_mail
 from django.conf import settings
 from django.db import connection, ProgrammingError
-from django.views.decorators.http import require_POST, require_GET
+from django.views.decorators.http import require_POST, require_GET, etag
+from django.views.decorators.cache import cache_control
 
 
 from openpyxl.utils import get_column_letter
@@ -270,8 +277,15 @@ def _normalize_time_label(v):
         return "12:00 p.m."
     return s
 
+# ---------- Report PDF (SSRS or local, per REPORT_RENDERERS) ----------
+def _ssrs_pdf(report_path, params, timeout=None):
+    return local_reports.render_pdf(
+        report_path, params,
+        lambda: _ssrs_fetch(report_path, params, timeout)
+    )
+
 # ---------- SSRS fetch (Render) ----------
-def _ssrs_pdf(report_path, params, timeout=60):
+def _ssrs_fetch(report_path, params, timeout=None):
     base = settings.SSRS_BASE_URL.rstrip('/')
     qp = [("rs:Command", "Render"), ("rs:Format", "PDF")]
     for k, v in params.items():
@@ -284,31 +298,19 @@ def _ssrs_pdf(report_path, params, timeout=60):
     )
     url = f"{base}?{requests.utils.quote(report_path, safe='/')}&{query}"
 
-    headers, auth = _make_auth_headers_and_authobj()
-
-    last = None
-    for _ in (1, 2):  # 1 retry on 5xx
-        try:
-            r = requests.get(
-                url, auth=auth, headers=headers,
-                verify=getattr(settings, "SSRS_VERIFY_TLS", False),
-                timeout=timeout
-            )
-        except requests.RequestException as ex:
-            raise requests.HTTPError(f"SSRS request failed for {url}\n{ex}") from ex
-
-        if r.status_code == 200:
-            return r.content
-        last = r
+    # breaker, jittered retries on 5xx, hedging and the overall deadline live in utils.ssrs
+    return fetch_pdf(url, report_path, _make_auth_headers_and_authobj, timeout)
 
-        # dump first part of SSRS error to your console for quick diagnosis
-        print("SSRS status:", r.status_code, r.reason)
-        print("SSRS body:", r.text[:1500])
 
-        if r.status_code < 500:
-            break  # don’t retry 4xx etc.
-
-    raise requests.HTTPError(f"{last.status_code} {last.reason} for {url}\n\n{last.text[:4000]}")
+def _report_pdf(report_path, param_name, uid, versions=None):
+    """_ssrs_pdf for one slip, served from the on-disk cache once it's Completed."""
+    uid_int = _int_or_none(uid)
+    if versions is None:
+        versions = slip_versions([uid_int]) if uid_int is not None else {}
+    return get_or_render(
+        report_path, uid_int, versions.get(uid_int),
+        lambda: _ssrs_pdf(report_path, {param_name: uid})
+    )
 
 
 # ---------- DB helper ----------
@@ -441,9 +443,9 @@ def dashboard(request):
 # ---------- Single PDFs (row buttons) ----------
 def print_utilization_slip(request, utilization_id):
     try:
-        pdf = _ssrs_pdf(
+        pdf = _report_pdf(
             settings.SSRS_UTILIZATION_REPORT_PATH,
-            {settings.SSRS_UTIL_PARAM_NAME: utilization_id}
+            settings.SSRS_UTIL_PARAM_NAME, utilization_id
         )
     except requests.HTTPError as e:
         return HttpResponse(f"SSRS error: {e}", status=502)
@@ -453,9 +455,9 @@ def print_utilization_slip(request, utilization_id):
 
 def print_attendance_sheet(request, utilization_id):
     try:
-        pdf = _ssrs_pdf(
+        pdf = _report_pdf(
             settings.SSRS_ATTENDANCE_REPORT_PATH,
-            {settings.SSRS_ATTEND_PARAM_NAME: utilization_id}
+            settings.SSRS_ATTEND_PARAM_NAME, utilization_id
         )
     except requests.HTTPError as e:
         return HttpResponse(f"SSRS error: {e}", status=502)
@@ -465,63 +467,36 @@ def print_attendance_sheet(request, utilization_id):
 
 # ---------- Preview modal API ----------
 def attendance_preview_api(request):
-    uid = request.GET.get("utilization_id")
-    if not uid:
+    uid = _int_or_none(request.GET.get("utilization_id"))
+    if uid is None:
         return JsonResponse({"error":"missing utilization_id"}, status=400)
 
-    with connection.cursor() as cursor:
-        cursor.execute("""
-            SELECT u.date, u.time_duration, l.lab_num,
-                   CONCAT(f.first_name,' ',f.last_name) AS instructor,
-                   c.course_code, u.student_year_and_section,
-                   COALESCE(u.remarks,'') AS remarks,
-                   u.processed_by,
-                   s.term, s.school_year
-            FROM UTILIZATION_SLIP u
-            JOIN LABORATORIES l ON u.lab_id = l.lab_id
-            JOIN LAB_SCHEDULE ls ON u.schedule_id = ls.schedule_id
-            JOIN ASSIGNED_TEACHER at ON ls.assigned_teacher_id = at.assigned_teacher_id
-            JOIN COURSE c ON at.course_id = c.course_id
-            JOIN FACULTY f ON u.requested_by = f.faculty_id AND f.is_archived = 0
-            JOIN SEMESTER s ON at.semester_id = s.semester_id
-            WHERE u.utilization_id = %s
-        """, [uid])
-        row = cursor.fetchone()
-        if not row:
-            return JsonResponse({"error":"not_found"}, status=404)
+    # Completed slips come from the preview cache (see utils.attendance_previews)
+    data = attendance_previews.get(uid)
+    if data is None:
+        return JsonResponse({"error":"not_found"}, status=404)
+    return JsonResponse(data)
 
-        cursor.execute("""
-            SELECT CONCAT(s.first_name, ' ',
-                          COALESCE(LEFT(s.middle_name,1)+'. ',''),
-                          s.last_name) AS full_name
-            FROM COMPUTER_LAB_ATTENDANCE a
-            JOIN STUDENTS s ON a.student_id = s.student_id
-            WHERE a.utilization_id = %s AND s.is_archived = 0
-            ORDER BY full_name
-        """, [uid])
-        students = [r[0] for r in cursor.fetchall()]
-
-        processed_by = ""
-        if row[7]:
-            cursor.execute("""
-                SELECT CONCAT(first_name,' ',last_name)
-                FROM FACULTY WHERE faculty_id=%s AND is_archived=0
-            """, [row[7]])
-            p = cursor.fetchone()
-            processed_by = p[0] if p else ""
 
+@require_GET
+def attendance_preview_batch_api(request):
+    """?ids=1,2,3 -> previews for a page of dashboard rows in one round trip."""
+    if not request.session.get('user_id') or request.session.get('role') != 'admin':
+        return JsonResponse({"error": "Unauthorized"}, status=403)
+
+    raw = ",".join(request.GET.getlist("ids")).split(",")
+    ids = [i for i in (_int_or_none(x.strip()) for x in raw) if i is not None]
+    ids = list(dict.fromkeys(ids))
+    limit = int(getattr(settings, "ATTENDANCE_PREVIEW_BATCH_MAX", 100))
+    if not ids:
+        return JsonResponse({"error": "missing ids"}, status=400)
+    if len(ids) > limit:
+        return JsonResponse({"error": f"at most {limit} ids per request"}, status=400)
+
+    previews = attendance_previews.get_many(ids)
     return JsonResponse({
-        "date": str(row[0]),
-        "time": _normalize_time_label(row[1]),
-        "lab": row[2],
-        "instructor": row[3],
-        "course": row[4],
-        "section": row[5],
-        "remarks": row[6],
-        "processed_by": processed_by,
-        "semester": f"{row[8]}, A.Y. {row[9]}",
-        "students_present": len(students),
-        "students": students,
+        "previews": {str(uid): data for uid, data in previews.items()},
+        "missing": [uid for uid in ids if uid not in previews],
     })
 
 # ---------- Bulk: merged / zip ----------
@@ -536,24 +511,16 @@ def print_queue(request):
     if not ids:
         return HttpResponse("No records to print for the selected filters.", status=404)
 
-    merger = PdfMerger()
+    jobs = report_jobs(ids, t)
     try:
-        for uid in ids:
-            if t in ("all", "utilization"):
-                merger.append(io.BytesIO(_ssrs_pdf(
-                    settings.SSRS_UTILIZATION_REPORT_PATH,
-                    {settings.SSRS_UTIL_PARAM_NAME: uid}
-                )))
-            if t in ("all", "attendance"):
-                merger.append(io.BytesIO(_ssrs_pdf(
-                    settings.SSRS_ATTENDANCE_REPORT_PATH,
-                    {settings.SSRS_ATTEND_PARAM_NAME: uid}
-                )))
+        pdfs = iter_render(jobs, _ssrs_pdf, slip_versions(ids))
+        if too_many_to_merge(jobs):
+            return zip_download(jobs, primed(pdfs), f"print_queue_{t}.zip")
+        merged = merge_pdfs(pdfs)
     except requests.HTTPError as e:
         return HttpResponse(f"SSRS error: {e}", status=502)
 
-    out = io.BytesIO(); merger.write(out); merger.close()
-    resp = HttpResponse(out.getvalue(), content_type="application/pdf")
+    resp = FileResponse(merged, content_type="application/pdf")
     resp['Content-Disposition'] = 'inline; filename=print_queue.pdf'
     return resp
 
@@ -568,25 +535,18 @@ def export_merged_pdf(request):
     if not ids:
         return HttpResponse("No records to export for the selected filters.", status=404)
 
-    merger = PdfMerger()
+    stamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+    jobs = report_jobs(ids, t)
     try:
-        for uid in ids:
-            if t in ("all", "utilization"):
-                merger.append(io.BytesIO(_ssrs_pdf(
-                    settings.SSRS_UTILIZATION_REPORT_PATH,
-                    {settings.SSRS_UTIL_PARAM_NAME: uid}
-                )))
-            if t in ("all", "attendance"):
-                merger.append(io.BytesIO(_ssrs_pdf(
-                    settings.SSRS_ATTENDANCE_REPORT_PATH,
-                    {settings.SSRS_ATTEND_PARAM_NAME: uid}
-                )))
+        pdfs = iter_render(jobs, _ssrs_pdf, slip_versions(ids))
+        if too_many_to_merge(jobs):
+            return zip_download(jobs, primed(pdfs), f"export_{t}_{stamp}.zip")
+        merged = merge_pdfs(pdfs)
     except requests.HTTPError as e:
         return HttpResponse(f"SSRS error: {e}", status=502)
 
-    out = io.BytesIO(); merger.write(out); merger.close()
-    filename = f"export_{t}_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-    resp = HttpResponse(out.getvalue(), content_type="application/pdf")
+    filename = f"export_{t}_{stamp}.pdf"
+    resp = FileResponse(merged, content_type="application/pdf")
     resp['Content-Disposition'] = f'attachment; filename="{filename}"'
     return resp
 
@@ -601,23 +561,14 @@ def export_pdfs(request):
     if not ids:
         return HttpResponse("No records to export for the selected filters.", status=404)
 
-    buf = io.BytesIO()
+    jobs = report_jobs(ids, t)
     try:
-        with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
-            for uid in ids:
-                if t in ("all", "utilization"):
-                    zf.writestr(f"UtilizationSlip_{uid}.pdf",
-                                _ssrs_pdf(settings.SSRS_UTILIZATION_REPORT_PATH,
-                                          {settings.SSRS_UTIL_PARAM_NAME: uid}))
-                if t in ("all", "attendance"):
-                    zf.writestr(f"AttendanceSheet_{uid}.pdf",
-                                _ssrs_pdf(settings.SSRS_ATTENDANCE_REPORT_PATH,
-                                          {settings.SSRS_ATTEND_PARAM_NAME: uid}))
+        pdfs = primed(iter_render(jobs, _ssrs_pdf, slip_versions(ids)))
     except requests.HTTPError as e:
         return HttpResponse(f"SSRS error: {e}", status=502)
 
     ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    resp = HttpResponse(buf.getvalue(), content_type="application/zip")
+    resp = StreamingHttpResponse(zip_stream(jobs, pdfs), content_type="application/zip")
     resp['Content-Disposition'] = f'attachment; filename=exports_{t}_{ts}.zip'
     return resp
 
@@ -627,17 +578,20 @@ def print_queue_single(request):
     if not uid:
         return HttpResponse("Missing utilization_id", status=400)
 
+    uid_int = _int_or_none(uid)
+    versions = slip_versions([uid_int]) if uid_int is not None else {}
+
     merger = PdfMerger()
     try:
         if t in ("both", "utilization"):
-            merger.append(io.BytesIO(_ssrs_pdf(
+            merger.append(io.BytesIO(_report_pdf(
                 settings.SSRS_UTILIZATION_REPORT_PATH,
-                {settings.SSRS_UTIL_PARAM_NAME: uid}
+                settings.SSRS_UTIL_PARAM_NAME, uid, versions
             )))
         if t in ("both", "attendance"):
-            merger.append(io.BytesIO(_ssrs_pdf(
+            merger.append(io.BytesIO(_report_pdf(
                 settings.SSRS_ATTENDANCE_REPORT_PATH,
-                {settings.SSRS_ATTEND_PARAM_NAME: uid}
+                settings.SSRS_ATTEND_PARAM_NAME, uid, versions
             )))
     except requests.HTTPError as e:
         return HttpResponse(f"SSRS error: {e}", status=502)
@@ -646,37 +600,85 @@ def print_queue_single(request):
     resp = HttpResponse(out.getvalue(), content_type="application/pdf")
     resp['Content-Disposition'] = f'inline; filename=session_{uid}.pdf'
     return resp
+
+# ---------- Bulk: background export jobs ----------
+@require_POST
+def export_job_submit(request):
+    if not request.session.get('user_id') or request.session.get('role') != 'admin':
+        return JsonResponse({"error": "Unauthorized"}, status=403)
+
+    fmt        = "zip" if request.POST.get("format") == "zip" else "pdf"
+    t          = request.POST.get("type", "all")  # all | utilization | attendance
+    lab_id     = _int_or_none(request.POST.get('lab_id'))
+    teacher_id = _int_or_none(request.POST.get('teacher_id'))
+    start_date = _date_or_none(request.POST.get('start_date'))
+    end_date   = _date_or_none(request.POST.get('end_date'))
+
+    ids = _filtered_utilization_ids(lab_id, teacher_id, start_date, end_date)
+    if not ids:
+        return JsonResponse({"error": "No records to export for the selected filters."}, status=404)
+
+    job_id = export_jobs.submit(
+        request.session['user_id'], fmt, t,
+        report_jobs(ids, t), _ssrs_pdf, slip_versions(ids)
+    )
+    return JsonResponse({
+        "job_id": job_id,
+        "status_url": reverse('export_job_status', args=[job_id]),
+        "download_url": reverse('export_job_download', args=[job_id]),
+    }, status=202)
+
+
+def _own_export_job(request, job_id):
+    if not request.session.get('user_id') or request.session.get('role') != 'admin':
+        return None
+    job = export_jobs.load(job_id)
+    if not job or job.get("owner") != request.session.get('user_id'):
+        return None
+    return job
+
+
+@require_GET
+def export_job_status(request, job_id):
+    job = _own_export_job(request, job_id)
+    if not job:
+        return JsonResponse({"error": "not_found"}, status=404)
+    return JsonResponse(export_jobs.progress(job))
+
+
+@require_GET
+def export_job_download(request, job_id):
+    job = _own_export_job(request, job_id)
+    if not job:
+        return HttpResponse("Export not found.", status=404)
+    if job["status"] != "done":
+        return HttpResponse("Export is not ready yet.", status=409)
+
+    path = export_jobs.result_path(job)
+    if not os.path.exists(path):
+        return HttpResponse("Export file has expired.", status=410)
+    ctype = "application/zip" if job["format"] == "zip" else "application/pdf"
+    return ranged_file_response(request, path, ctype, job["filename"])
+
+
+# ---------- SSRS health (admin) ----------
+@require_GET
+def ssrs_stats(request):
+    """Breaker state + per-report latency/error counters for this worker process."""
+    if not request.session.get('user_id') or request.session.get('role') != 'admin':
+        return JsonResponse({"error": "Unauthorized"}, status=403)
+    return JsonResponse(ssrs.stats())
 # MANAGE COURSES
 
 
+# Table/column checks answer from the schema registry (read once per process,
+# `manage.py refresh_schema` after migrations) instead of INFORMATION_SCHEMA.
 def _has_table(table):
-    with connection.cursor() as c:
-        try:
-            c.execute("""
-                SELECT 1
-                FROM INFORMATION_SCHEMA.TABLES
-                WHERE TABLE_NAME = %s
-            """, [table])
-            return c.fetchone() is not None
-        except Exception:
-            return False
+    return schema.has_table(table)
 
 
 def _has_column(table, column):
-    with connection.cursor() as c:
-        try:
-            c.execute("""
-                SELECT 1
-                FROM INFORMATION_SCHEMA.COLUMNS
-                WHERE TABLE_NAME = %s AND COLUMN_NAME = %s
-            """, [table, column])
-            return c.fetchone() is not None
-        except Exception:
-            try:
-                c.execute(f"SELECT TOP 0 [{column}] FROM {table}")
-                return True
-            except Exception:
-                return False
+    return schema.has_column(table, column)
 
 
 def _parse_date(s):
@@ -1348,19 +1350,6 @@ def hard_delete_program(request, program_id):
     return _safe_redirect_back(request, "manage_courses")
 # MANAGE STUDENTS
 
-def _has_column(table_name: str, column_name: str) -> bool:
-    """SQL Server column-existence check using INFORMATION_SCHEMA."""
-    with connection.cursor() as c:
-        c.execute("""
-            SELECT 1
-            FROM INFORMATION_SCHEMA.COLUMNS
-            WHERE TABLE_NAME = %s AND COLUMN_NAME = %s
-        """, [table_name, column_name])
-        return c.fetchone() is not None
-
-
-
-
 def _student_blockers(student_id: int) -> dict:
     """Counts child rows that block permanent delete."""
     blockers = {"attendance": 0}
@@ -1611,6 +1600,7 @@ def save_student(request, student_id):
                    email=%s, stud_num=%s
              WHERE student_id=%s
         """, [first_name, middle_name, last_name, email_norm, stud_num_norm, student_id])
+    attendance_previews.invalidate_all()
 
     # status transitions
     if status == "inactive" and current_archived == 0:
@@ -1627,6 +1617,7 @@ def save_student(request, student_id):
     else:
         messages.success(request, "Student updated.")
 
+    rfid_index.student_changed(student_id)
     return redirect('manage_students')
 
 
@@ -1655,6 +1646,8 @@ def delete_student(request, student_id):
             """, [student_id, admin_id])
 
     if archived:
+        attendance_previews.invalidate_all()
+        rfid_index.student_changed(student_id)
         messages.success(request, "Student archived.")
     else:
         messages.info(request, "Student already archived or not found.")
@@ -1681,6 +1674,8 @@ def restore_student(request, student_id):
             """, [student_id, admin_id])
 
     if restored:
+        attendance_previews.invalidate_all()
+        rfid_index.student_changed(student_id)
         messages.success(request, "Student restored.")
     else:
         messages.info(request, "Student was not archived or doesn’t exist.")
@@ -1717,6 +1712,7 @@ def hard_delete_student(request, student_id):
         return redirect('manage_students')
 
     if deleted:
+        rfid_index.student_changed(student_id)
         messages.success(request, "Student permanently deleted.")
     else:
         messages.info(request, "Student was already removed or does not exist.")
@@ -1760,6 +1756,7 @@ def assign_rfid(request):
              WHERE student_id = %s
                AND (rfid_sticker_id IS NULL OR rfid_sticker_id = '')
         """, [scanned_rfid, student_id])
+    rfid_index.student_changed(student_id)
 
     return JsonResponse({"status": "success", "message": "RFID assigned successfully."})
 
@@ -1915,15 +1912,6 @@ def upload_excel(request):
 # FACULTY
 # ----------------- helpers -----------------
 
-def _has_column(table, column) -> bool:
-    with connection.cursor() as c:
-        c.execute("""
-            SELECT 1
-            FROM INFORMATION_SCHEMA.COLUMNS
-            WHERE TABLE_NAME=%s AND COLUMN_NAME=%s
-        """, [table, column])
-        return c.fetchone() is not None
-
 def _admin_count(include_archived: bool = False) -> int:
     with connection.cursor() as c:
         if include_archived:
@@ -2682,6 +2670,10 @@ def save_teacher_json(request, faculty_id):
         with connection.cursor() as c:
             c.execute("UPDATE FACULTY SET is_archived=0 WHERE faculty_id=%s", [faculty_id])
 
+    attendance_previews.invalidate_all()
+    rfid_index.teacher_changed(faculty_id)
+    timetable.changed_all()
+    week_grid.changed_all()
     return JsonResponse({"ok": True, "message": "Saved successfully."})
 
 
@@ -2768,6 +2760,7 @@ def assign_teacher_rfid(request):
             SET rfid_sticker_id = %s
             WHERE faculty_id = %s AND ISNULL(is_archived,0) = 0
         """, [scanned_rfid, faculty_id])
+    rfid_index.teacher_changed(faculty_id)
 
     return JsonResponse({
         "status": "success",
@@ -2977,6 +2970,8 @@ def unassign_course(request, assigned_teacher_id):
             cursor.execute("UPDATE ASSIGNED_TEACHER SET is_active=0 WHERE assigned_teacher_id=%s", [assigned_teacher_id])
         except Exception:
             cursor.execute("DELETE FROM ASSIGNED_TEACHER WHERE assigned_teacher_id=%s", [assigned_teacher_id])
+            timetable.changed_all()
+            week_grid.changed_all()
 
     messages.success(request, "Course unassigned.")
     return redirect(request.META.get("HTTP_REFERER") or "manage_faculty")
@@ -3028,6 +3023,10 @@ def delete_teacher(request, teacher_id):
             """, [faculty_id, admin_id])
 
     if archived:
+        attendance_previews.invalidate_all()
+        rfid_index.teacher_changed(faculty_id)
+        timetable.changed_all()
+        week_grid.changed_all()
         messages.success(request, "Teacher archived. Related schedules were marked as Cancelled.")
     else:
         messages.info(request, "Teacher was already archived or does not exist.")
@@ -3055,6 +3054,8 @@ def restore_teacher(request, faculty_id):
             """, [faculty_id, admin_id])
 
     if restored:
+        attendance_previews.invalidate_all()
+        rfid_index.teacher_changed(faculty_id)
         messages.success(request, "Teacher restored.")
     else:
         messages.info(request, "Teacher was not archived or does not exist.")
@@ -3110,6 +3111,9 @@ def hard_delete_teacher(request, faculty_id):
         return redirect('manage_faculty')
 
     if deleted:
+        rfid_index.teacher_changed(faculty_id)
+        timetable.changed_all()
+        week_grid.changed_all()
         messages.success(request, "Teacher permanently deleted.")
     else:
         messages.info(request, "Teacher was already removed or does not exist.")
@@ -3220,6 +3224,8 @@ def insert_lab_schedule_if_assigned(cursor, lab_id, faculty_id):
                 student_year_and_section, number_of_students
             ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
         """, [lab_id, faculty_id, 'Reserved', timezone.localdate(), time(0,0), time(0,0), '', 0])
+        timetable.lab_changed(lab_id)
+        week_grid.changed(lab_id, timezone.localdate())
 
 
 @require_POST
@@ -3259,6 +3265,7 @@ def add_laboratory(request):
         lab_id = row[0]
         if faculty_id:
             insert_lab_schedule_if_assigned(cursor, lab_id, faculty_id)
+    readers.changed()
 
     messages.success(request, "Laboratory successfully added.")
     return redirect('manage_laboratories')
@@ -3343,10 +3350,14 @@ def save_laboratory_json(request, lab_id):
             if status == "inactive" and current_archived == 0:
                 c.execute("UPDATE LABORATORIES SET is_archived=1, rfid_reader_id=NULL WHERE lab_id=%s", [lab_id])
                 c.execute("UPDATE LAB_SCHEDULE SET status='Cancelled' WHERE lab_id=%s AND date >= %s", [lab_id, today])
+                timetable.lab_changed(lab_id)
+                week_grid.changed(lab_id)
             elif status == "active" and current_archived == 1:
                 c.execute("UPDATE LABORATORIES SET is_archived=0 WHERE lab_id=%s", [lab_id])
     except Exception:
+        readers.changed()
         return JsonResponse({"error": "Update failed."}, status=500)
+    readers.changed()
 
     msg = "Saved successfully."
     if status == "inactive" and current_archived == 0:
@@ -3381,6 +3392,9 @@ def archive_laboratory(request, lab_id):
             """, [lab_id, today])
 
     if archived:
+        readers.changed()
+        timetable.lab_changed(lab_id)
+        week_grid.changed(lab_id)
         messages.success(request, "Laboratory archived. Upcoming schedules were cancelled and RFID cleared.")
     else:
         messages.info(request, "Laboratory was already archived or does not exist.")
@@ -3401,6 +3415,7 @@ def restore_laboratory(request, lab_id):
         restored = c.rowcount or 0
 
     if restored:
+        readers.changed()
         messages.success(request, "Laboratory restored.")
     else:
         messages.info(request, "Laboratory was not archived or does not exist.")
@@ -3428,6 +3443,7 @@ def hard_delete_laboratory(request, lab_id):
         return redirect('manage_laboratories')
 
     if deleted:
+        readers.changed()
         messages.success(request, "Laboratory permanently deleted.")
     else:
         messages.info(request, "Laboratory was already removed or does not exist.")
@@ -3662,6 +3678,8 @@ def manage_schedule(request):
             "selected_lab": selected_lab_int,
             "base_week": start_w.isoformat(),
             "week_url": reverse("admin_week_data"),
+            "live": live.enabled(),
+            "safety_poll_ms": int(getattr(settings, "SSE_SAFETY_POLL_SECONDS", 60)) * 1000,
         }),
         "week_url": reverse("admin_week_data"),
         "base_week": start_w.isoformat(),
@@ -3672,12 +3690,19 @@ def manage_schedule(request):
 # ---------------------------------------------------------
 # Week data JSON for grids
 # ---------------------------------------------------------
+def _week_data_etag(request):
+    g = request.GET
+    return etags.week_tag(g.get("lab_id"), g.get("week"), timezone.localdate(), g.get("include_requests") == "1")
+
+
 @require_http_methods(["GET"])
+@cache_control(private=True, no_cache=True)
+@etag(_week_data_etag)
 def admin_week_data(request):
     lab_id = request.GET.get("lab_id")
     week_str = request.GET.get("week")
     include_requests = request.GET.get("include_requests") == "1"
-    if not lab_id:
+    if not lab_id or not lab_id.isdigit():
         return JsonResponse({"error": "lab_id required"}, status=400)
 
     try:
@@ -3685,6 +3710,13 @@ def admin_week_data(request):
     except Exception:
         base_date = timezone.localdate()
 
+    # same lab/week/filter -> same grid; served from the week-grid cache
+    return JsonResponse(week_grid.get_or_build(
+        "admin", lab_id, base_date, include_requests, None,
+        lambda: _admin_week_payload(lab_id, base_date, include_requests)))
+
+
+def _admin_week_payload(lab_id, base_date, include_requests):
     start_w = _monday_of(base_date)
     end_w = _sunday_of(base_date)
     week_range_display = f"{start_w.strftime('%b %d')} - {end_w.strftime('%d, %Y')}"
@@ -3776,12 +3808,197 @@ def admin_week_data(request):
                     "requested_by": _short_name(rfn, rln),
                 })
 
-    return JsonResponse({
+    return {
         "week_range": week_range_display,
-        "entries": entries,
-        "req_entries": req_entries,
+        "entries": {d: dict(times) for d, times in entries.items()},
+        "req_entries": {d: dict(times) for d, times in req_entries.items()},
         "time_slots": sorted(time_set),
+    }
+
+# ---------------------------------------------------------
+# Admin: Campus week overview (every lab, one request)
+# ---------------------------------------------------------
+@require_http_methods(["GET"])
+def campus_overview(request):
+    if not request.session.get("user_id") or request.session.get("role") != "admin":
+        return redirect("login")
+
+    admin_id = request.session.get("user_id")
+    context = build_user_header_context(admin_id)
+
+    week_str = request.GET.get("week")
+    try:
+        base_date = dt.strptime(week_str, "%Y-%m-%d").date() if week_str else timezone.localdate()
+    except Exception:
+        base_date = timezone.localdate()
+
+    context.update({
+        "current_page": "Campus Overview",
+        "days": ["Monday","Tuesday","Wednesday","Thursday","Friday","Saturday","Sunday"],
+        "config_json": json.dumps({
+            "base_week": _monday_of(base_date).isoformat(),
+            "week_url": reverse("admin_campus_week_data"),
+            "schedule_url": reverse("manage_schedule"),
+        }),
     })
+    return render(request, "admin/campus_overview.html", context)
+
+
+def _campus_week_etag(request):
+    # no tag for non-admins, so they always reach the 403 below instead of a 304
+    if not request.session.get("user_id") or request.session.get("role") != "admin":
+        return None
+    return etags.campus_week_tag(request.GET.get("week"), timezone.localdate())
+
+
+@require_http_methods(["GET"])
+@cache_control(private=True, no_cache=True)
+@etag(_campus_week_etag)
+def admin_campus_week_data(request):
+    if not request.session.get("user_id") or request.session.get("role") != "admin":
+        return JsonResponse({"error": "Unauthorized"}, status=403)
+
+    week_str = request.GET.get("week")
+    try:
+        base_date = dt.strptime(week_str, "%Y-%m-%d").date() if week_str else timezone.localdate()
+    except Exception:
+        base_date = timezone.localdate()
+
+    return JsonResponse(week_grid.get_or_build_campus(base_date, lambda: _campus_week_payload(base_date)))
+
+
+def _booked_minutes(spans, open_from, open_to):
+    """Minutes covered by the union of (start, end) spans, clipped to the open window when there is one."""
+    total, cur_s, cur_e = 0, None, None
+    for s, e in sorted(spans):
+        if open_from is not None:
+            s, e = max(s, open_from), min(e, open_to)
+        if e <= s:
+            continue
+        if cur_e is None or s > cur_e:
+            if cur_e is not None:
+                total += cur_e - cur_s
+            cur_s, cur_e = s, e
+        else:
+            cur_e = max(cur_e, e)
+    if cur_e is not None:
+        total += cur_e - cur_s
+    return total
+
+
+def _campus_week_payload(base_date):
+    start_w = _monday_of(base_date)
+    end_w = _sunday_of(base_date)
+    week_range_display = f"{start_w.strftime('%b %d')} - {end_w.strftime('%d, %Y')}"
+    week_days = [start_w + timedelta(days=i) for i in range(7)]
+
+    def _mins(t):
+        return t.hour * 60 + t.minute
+
+    # --- OPERATING_TIME: open window per weekday ---
+    hours = {}
+    if _has_table("OPERATING_TIME"):
+        with connection.cursor() as cur:
+            cur.execute("SELECT day_of_week, ISNULL(is_open,1), start_time, end_time FROM OPERATING_TIME")
+            for dow, is_open, st, et in cur.fetchall():
+                hours[int(dow)] = (bool(is_open), st, et)
+
+    windows = {}
+    for d in week_days:
+        is_open, st, et = hours.get(_db_day_of_week(d.weekday()), (True, None, None))
+        if is_open and st and et and st < et:
+            windows[d] = (_mins(st), _mins(et))
+        elif not is_open:
+            windows[d] = (0, 0)
+        else:
+            windows[d] = (None, None)  # no hours set: nothing to measure against
+
+    # --- SCHEDULES for every non-archived lab (hide only Cancelled/Rejected) ---
+    labs = {}
+    with connection.cursor() as cur:
+        cur.execute("""
+            SELECT l.lab_id, l.lab_num,
+                   s.date, s.start_time, s.end_time,
+                   f.first_name, f.last_name, f.faculty_id,
+                   c.course_code,
+                   s.student_year_and_section
+              FROM LABORATORIES l
+         LEFT JOIN LAB_SCHEDULE s
+                ON s.lab_id = l.lab_id
+               AND s.date BETWEEN %s AND %s
+               AND UPPER(LTRIM(RTRIM(ISNULL(s.status, '')))) NOT IN ('CANCELLED','REJECTED')
+         LEFT JOIN ASSIGNED_TEACHER at ON s.assigned_teacher_id = at.assigned_teacher_id
+         LEFT JOIN COURSE          c  ON at.course_id = c.course_id
+         LEFT JOIN FACULTY         f  ON at.faculty_id = f.faculty_id AND ISNULL(f.is_archived,0)=0
+             WHERE ISNULL(l.is_archived,0) = 0
+             ORDER BY l.lab_num, s.date, s.start_time
+        """, [start_w, end_w])
+        for lab_id, lab_num, d, st, et, fn, ln, fid, course_code, section in cur.fetchall():
+            lab = labs.get(lab_id)
+            if lab is None:
+                lab = labs[lab_id] = {
+                    "lab_id": lab_id,
+                    "lab_num": lab_num,
+                    "entries": defaultdict(lambda: defaultdict(list)),
+                    "spans": defaultdict(list),
+                    "time_set": set(),
+                }
+            if d is None or st is None or et is None:
+                continue
+            dayname = d.strftime("%A")
+            tl_12 = f"{_fmt_hhmm_12(st)} - {_fmt_hhmm_12(et)}"
+            lab["entries"][dayname][tl_12].append({
+                "teacher": _short_name(fn, ln),
+                "course": course_code or "",
+                "section": section or "",
+                "time": tl_12,
+                "date": d.isoformat(),
+                "start": st.strftime("%H:%M:%S"),
+                "end": et.strftime("%H:%M:%S"),
+                "faculty_id": fid,
+            })
+            lab["time_set"].add(tl_12)
+            lab["spans"][d].append((_mins(st), _mins(et)))
+
+    # --- per-lab occupancy: booked minutes vs open minutes per day ---
+    out = []
+    for lab in labs.values():
+        occupancy, booked_total, open_total = {}, 0, 0
+        for d in week_days:
+            open_from, open_to = windows[d]
+            booked = _booked_minutes(lab["spans"].get(d, []), open_from, open_to)
+            open_mins = (open_to - open_from) if open_from is not None else None
+            occupancy[d.strftime("%A")] = {
+                "booked": booked,
+                "open": open_mins,
+                "pct": round(100 * booked / open_mins) if open_mins else None,
+            }
+            booked_total += booked
+            open_total += open_mins or 0
+        out.append({
+            "lab_id": lab["lab_id"],
+            "lab_num": lab["lab_num"],
+            "entries": {d: dict(times) for d, times in lab["entries"].items()},
+            "time_slots": sorted(lab["time_set"]),
+            "occupancy": occupancy,
+            "booked_minutes": booked_total,
+            "open_minutes": open_total,
+            "pct": round(100 * booked_total / open_total) if open_total else None,
+        })
+
+    return {
+        "week_range": week_range_display,
+        "week_start": start_w.isoformat(),
+        "dates": {d.strftime("%A"): d.isoformat() for d in week_days},
+        "hours": {
+            d.strftime("%A"): {
+                "open": windows[d][0] is None or windows[d][1] > windows[d][0],
+                "minutes": (windows[d][1] - windows[d][0]) if windows[d][0] is not None else None,
+            }
+            for d in week_days
+        },
+        "labs": out,
+    }
 
 # ---------------------------------------------------------
 # Optional: list all pending requests for a lab (JSON)
@@ -3944,6 +4161,9 @@ def admin_create_schedule(request):
             """, [lab_id, assigned_teacher_id, faculty_id, cur_date, start_time_str, end_time_str, section, ot_id])
             created += 1
             cur_date += timedelta(days=1)
+    if created:
+        timetable.lab_changed(lab_id)
+        week_grid.changed(lab_id, start_date, end_date)
 
     if created == 0:
         def _fmt(d: date) -> str: return d.strftime("%Y-%m-%d")
@@ -4061,6 +4281,7 @@ def approve_reservation(request, slip_id):
                 VALUES (%s,%s,%s,%s,%s,%s,%s,'Scheduled', %s)
             """, [lab_id, assigned_teacher_id, faculty_id, d, st, et, section, ot_id])
             schedule_id = cur.fetchone()[0]
+            timetable.lab_changed(lab_id)
 
         # Link & approve slip
         cur.execute("""
@@ -4071,6 +4292,7 @@ def approve_reservation(request, slip_id):
                    assigned_teacher_id = COALESCE(assigned_teacher_id, %s)
              WHERE utilization_id=%s
         """, [admin_id, schedule_id, assigned_teacher_id, slip_id])
+        week_grid.changed(lab_id, d)
 
         # Notify
         cur.execute("SELECT lab_num FROM LABORATORIES WHERE lab_id=%s", [lab_id])
@@ -4106,12 +4328,9 @@ def approve_reservation(request, slip_id):
                 channel = f"admin-{faculty_id}"
 
             if channel:
-                try:
-                    realtime.trigger(channel, "notification", {
-                        "unread_count": unread,
-                    })
-                except Exception as e:
-                    print("Pusher error (admin approve_reservation):", e)
+                realtime.publish(channel, "notification", {
+                    "unread_count": unread,
+                })
 
         if requester_email:
             try:
@@ -4155,6 +4374,8 @@ def reject_reservation(request, slip_id):
                SET status='Rejected', processed_by=%s
              WHERE utilization_id=%s
         """, [admin_id, slip_id])
+        timetable.lab_changed(lab_id)
+        week_grid.changed(lab_id, d)
 
         cur.execute("SELECT lab_num FROM LABORATORIES WHERE lab_id=%s", [lab_id])
         lab_num_row = cur.fetchone()
@@ -4190,12 +4411,9 @@ def reject_reservation(request, slip_id):
                 channel = f"admin-{faculty_id}"
 
             if channel:
-                try:
-                    realtime.trigger(channel, "notification", {
-                        "unread_count": unread,
-                    })
-                except Exception as e:
-                    print("Pusher error (admin reject_reservation):", e)
+                realtime.publish(channel, "notification", {
+                    "unread_count": unread,
+                })
 
         requester_email = frow[1]
         if requester_email:
@@ -4498,45 +4716,9 @@ from django.http import JsonResponse
 from django.db import connection
 from django.utils import timezone
 
-def _column_exists(cursor, table_name: str, column_name: str) -> bool:
-    cursor.execute("""
-        SELECT 1
-        FROM INFORMATION_SCHEMA.COLUMNS
-        WHERE TABLE_NAME = %s AND COLUMN_NAME = %s
-    """, [table_name, column_name])
-    return cursor.fetchone() is not None
-
 def _bool_as_int(b):
     return 1 if b else 0
 
-def _complete_overdue_sessions(cursor, today, now_time):
-    """
-    For UTILIZATION_SLIP rows (today) still 'Active' but with end_time <= now_time:
-      1) auto time_out students to the slip's end_time
-      2) mark the slip as 'Completed'
-    """
-    # Auto student tap-out to session end
-    cursor.execute("""
-        UPDATE cla
-           SET time_out = u.end_time
-          FROM COMPUTER_LAB_ATTENDANCE AS cla
-          JOIN UTILIZATION_SLIP       AS u
-            ON u.utilization_id = cla.utilization_id
-         WHERE u.status   = 'Active'
-           AND u.date     = %s
-           AND u.end_time <= %s
-           AND cla.time_out IS NULL
-    """, [today, now_time])
-
-    # Mark sessions completed
-    cursor.execute("""
-        UPDATE UTILIZATION_SLIP
-           SET status = 'Completed'
-         WHERE status   = 'Active'
-           AND date     = %s
-           AND end_time <= %s
-    """, [today, now_time])
-
 # Build a safe INSERT for UTILIZATION_SLIP that only includes columns that exist.
 def _insert_utilization_for_schedule(cursor, schedule_id, today, actual_start, scheduled_end,
                                      teacher_id, time_duration):
@@ -4545,9 +4727,9 @@ def _insert_utilization_for_schedule(cursor, schedule_id, today, actual_start, s
     Column list is computed at runtime to avoid 42S22 if your DB is missing some columns.
     Remarks will be left NULL (no 'Auto RFID Check-in' text).
     """
-    has_us_num_students  = _column_exists(cursor, "UTILIZATION_SLIP", "number_of_students")
-    has_us_assigned_tid  = _column_exists(cursor, "UTILIZATION_SLIP", "assigned_teacher_id")
-    has_ls_num_students  = _column_exists(cursor, "LAB_SCHEDULE",    "number_of_students")
+    has_us_num_students  = _has_column("UTILIZATION_SLIP", "number_of_students")
+    has_us_assigned_tid  = _has_column("UTILIZATION_SLIP", "assigned_teacher_id")
+    has_ls_num_students  = _has_column("LAB_SCHEDULE",    "number_of_students")
 
     # Base column list
     cols = [
@@ -4626,80 +4808,138 @@ def rfid_check_in(request):
     if request.method != "POST":
         return JsonResponse({"error": "Invalid method."}, status=405)
 
-    rfid_code = request.POST.get("rfid_code")
-    reader_id = request.POST.get("rfid_reader_id")
+    return _tap_response(*_check_in(*_tap_args(request)))
 
-    now = timezone.localtime()
-    today = now.date()
-    current_time = now.time()
 
-    with connection.cursor() as cursor:
-        # ✅ Always clean up overdue Active sessions first
-        _complete_overdue_sessions(cursor, today, current_time)
+@csrf_exempt
+async def rfid_check_in_async(request):
+    """
+    Same as rfid_check_in for ASGI deployments: the DB work runs on the
+    bounded pool in utils.offload and Pusher sends happen in the background,
+    so one process can keep many readers going without a thread per tap.
+    """
+    if request.method != "POST":
+        return JsonResponse({"error": "Invalid method."}, status=405)
 
-        # Teacher?
-        cursor.execute("""
-            SELECT faculty_id, first_name, last_name
-              FROM FACULTY
-             WHERE rfid_sticker_id = %s AND is_archived = 0
-        """, [rfid_code])
-        teacher = cursor.fetchone()
-        if teacher:
-            return handle_teacher_rfid(cursor, teacher, reader_id, now, today, current_time)
+    return _tap_response(*await offload.run(_check_in, *_tap_args(request)))
 
-        # Student?
-        cursor.execute("""
-            SELECT student_id, first_name, last_name
-              FROM STUDENTS
-             WHERE rfid_sticker_id = %s AND is_archived = 0
-        """, [rfid_code])
-        student = cursor.fetchone()
-        if student:
-            return handle_student_rfid(cursor, student, reader_id, now, today, current_time)
 
-        return JsonResponse({"error": "Unknown RFID code."}, status=404)
+def _tap_args(request):
+    rfid_code = (request.POST.get("rfid_code") or "").strip()
+    reader_id = (request.POST.get("rfid_reader_id") or "").strip()
+    idem_key = (request.headers.get("Idempotency-Key") or request.POST.get("idempotency_key") or "").strip()
+    return rfid_code, reader_id, idem_key
+
+
+def _tap_response(result, replayed):
+    payload, status = result
+    response = JsonResponse(payload, status=status)
+    if replayed:
+        response["X-Tap-Replayed"] = "1"
+    return response
+
+
+def _check_in(rfid_code, reader_id, idem_key=""):
+    """One tap -> ((payload, status), replayed). Blocking; shared by the sync and async views."""
+    readers.seen(reader_id)
+
+    def _tap():
+        now = timezone.localtime()
+        today = now.date()
+        current_time = now.time()
+
+        tap_timing.begin()
+        try:
+            # overdue sessions are completed by utils.sweeper, not here
+            with connection.cursor() as cursor:
+                # Teacher or student? (in-memory index, no DB round trip)
+                kind, person = rfid_index.resolve(rfid_code)
+                tap_timing.mark("identity")
+                if kind == "teacher":
+                    return _teacher_tap(cursor, person, reader_id, now, today, current_time)
+                if kind == "student":
+                    return _student_tap(cursor, person, reader_id, now, today, current_time)
+
+            return {"error": "Unknown RFID code."}, 404
+        finally:
+            tap_timing.mark("db")  # whatever ran after the last stage
+            tap_timing.end()
+
+    # a double read of one card on one reader gets the first read's answer;
+    # a retried request with the same Idempotency-Key gets its first answer
+    def _deduped():
+        return tap_dedup.run(("tap", rfid_code, reader_id), _tap, tap_dedup.tap_window())
+
+    if idem_key:
+        (result, replayed), again = tap_dedup.run(
+            ("key", reader_id, idem_key), _deduped, tap_dedup.idempotency_window())
+        return result, replayed or again
+    return _deduped()
+
+
+@csrf_exempt
+def rfid_heartbeat(request):
+    """Readers ping this between taps so admins can tell idle from dead."""
+    if request.method != "POST":
+        return JsonResponse({"error": "Invalid method."}, status=405)
+
+    reader_id = (request.POST.get("rfid_reader_id") or "").strip()
+    if not reader_id:
+        return JsonResponse({"error": "Missing rfid_reader_id."}, status=400)
+    readers.seen(reader_id, tap=False)
+
+    lab_row = readers.lab_for(reader_id)
+    return JsonResponse({
+        "ok": True,
+        "registered": lab_row is not None,
+        "lab_num": lab_row[1] if lab_row else None,
+    })
+
+
+@require_GET
+def rfid_tap_timing(request):
+    """Admin JSON: p50/p95/p99 per tap stage, overall and per lab (this worker process)."""
+    if not request.session.get('user_id') or request.session.get('role') != 'admin':
+        return JsonResponse({"error": "Unauthorized"}, status=403)
+    return JsonResponse(tap_timing.stats())
+
+
+@require_GET
+def rfid_reader_status(request):
+    """Admin JSON: every reader with its lab and last-seen time (this worker's view)."""
+    if not request.session.get('user_id') or request.session.get('role') != 'admin':
+        return JsonResponse({"error": "Unauthorized"}, status=403)
+    return JsonResponse({"readers": readers.status()})
 
 
 # -------------------------------------------------
 # Teacher flow
 # -------------------------------------------------
-def handle_teacher_rfid(cursor, teacher, reader_id, now, today, current_time):
+def _teacher_tap(cursor, teacher, reader_id, now, today, current_time):
+    """One teacher tap -> (response dict, HTTP status). Shared by single and batch check-in."""
     from datetime import datetime as dt
 
     teacher_id, fname, lname = teacher
 
     # Reader → lab
-    cursor.execute("SELECT lab_id, lab_num FROM LABORATORIES WHERE rfid_reader_id = %s", [reader_id])
-    lab_row = cursor.fetchone()
+    lab_row = readers.lab_for(reader_id)
+    tap_timing.mark("reader")
     if not lab_row:
-        return JsonResponse({"error": "Unregistered RFID reader."}, status=404)
+        return {"error": "Unregistered RFID reader."}, 404
     lab_id, lab_num = lab_row
+    tap_timing.set_lab(lab_num)
 
-    # Match a valid schedule for this teacher
-    cursor.execute("""
-        SELECT TOP 1
-            s.schedule_id, s.start_time, s.end_time, s.assigned_teacher_id,
-            s.reserved_to, at.faculty_id AS at_faculty_id
-        FROM LAB_SCHEDULE AS s
-        LEFT JOIN ASSIGNED_TEACHER AS at
-               ON at.assigned_teacher_id = s.assigned_teacher_id
-        WHERE s.lab_id = %s
-          AND s.date   = %s
-          AND DATEADD(MINUTE, -10, s.start_time) <= %s
-          AND %s <= s.end_time
-          AND (s.reserved_to = %s OR at.faculty_id = %s)
-        ORDER BY s.start_time
-    """, [lab_id, today, current_time, current_time, teacher_id, teacher_id])
-
-    schedule = cursor.fetchone()
+    # Match a valid schedule for this teacher (today's timetable, 10-min early window)
+    schedule = timetable.teacher_schedule(lab_id, today, teacher_id, current_time)
+    tap_timing.mark("schedule")
 
     if not schedule:
-        return JsonResponse({
+        return {
             "error": "No active schedule or approved request at this time.",
             "role": "teacher",
             "teacher": f"{fname} {lname}",
             "lab": f"Lab {lab_num}",
-        }, status=403)
+        }, 403
 
     schedule_id, scheduled_start, scheduled_end, assigned_teacher_id, _reserved_to, _at_fac = schedule
 
@@ -4725,12 +4965,12 @@ def handle_teacher_rfid(cursor, teacher, reader_id, now, today, current_time):
         utilization_id, start_in, _end_orig, status = existing
 
         if status == "Completed":
-            return JsonResponse({
+            return {
                 "status": "Already tapped out.",
                 "role": "teacher",
                 "teacher": f"{fname} {lname}",
                 "lab": f"Lab {lab_num}",
-            })
+            }, 200
 
         # ----------------------------------------
         # CASE 2 — Approved → Active (Check-in)
@@ -4746,15 +4986,15 @@ def handle_teacher_rfid(cursor, teacher, reader_id, now, today, current_time):
             """, [current_time, scheduled_end, new_dur, utilization_id])
 
             # 🔔 Push updated active sessions (REALTIME)
-            _push_active_sessions_for_lab(cursor, lab_id)
+            _push_active_sessions_for_lab(cursor, lab_id, teacher_id)
 
-            return JsonResponse({
+            return {
                 "status": "Check-in successful (from approved request).",
                 "role": "teacher",
                 "teacher": f"{fname} {lname}",
                 "lab": f"Lab {lab_num}",
                 "checked_in_at": now.strftime("%H:%M:%S"),
-            })
+            }, 200
 
         # ----------------------------------------
         # CASE 3 — Active → Completed (Tap-out)
@@ -4775,16 +5015,21 @@ def handle_teacher_rfid(cursor, teacher, reader_id, now, today, current_time):
                  WHERE utilization_id=%s AND time_out IS NULL
             """, [current_time, utilization_id])
 
+            attendance_previews.changed([utilization_id])
+
             # 🔔 Push updated active sessions (REALTIME)
-            _push_active_sessions_for_lab(cursor, lab_id)
+            _push_active_sessions_for_lab(cursor, lab_id, teacher_id)
+
+            # Warm the report cache in the background (doesn't delay the tap)
+            prerender.enqueue([utilization_id], _ssrs_pdf)
 
-            return JsonResponse({
+            return {
                 "status": "Tap-out successful.",
                 "role": "teacher",
                 "teacher": f"{fname} {lname}",
                 "lab": f"Lab {lab_num}",
                 "actual_end": now.strftime("%H:%M:%S"),
-            })
+            }, 200
 
     # ----------------------------------------
     # CASE 4 — No slip exists → New slip ACTIVE
@@ -4804,53 +5049,43 @@ def handle_teacher_rfid(cursor, teacher, reader_id, now, today, current_time):
     )
 
     # 🔔 Push updated active sessions (REALTIME)
-    _push_active_sessions_for_lab(cursor, lab_id)
+    _push_active_sessions_for_lab(cursor, lab_id, teacher_id)
 
-    return JsonResponse({
+    return {
         "status": "Check-in successful.",
         "role": "teacher",
         "teacher": f"{fname} {lname}",
         "lab": f"Lab {lab_num}",
         "checked_in_at": now.strftime("%H:%M:%S"),
-    })
+    }, 200
 
 
 # -------------------------------------------------
 # Student flow
 # -------------------------------------------------
-def handle_student_rfid(cursor, student, reader_id, now, today, current_time):
+def _student_tap(cursor, student, reader_id, now, today, current_time):
     from datetime import datetime as dt, timedelta
 
     student_id, sfname, slname = student
 
     # Map reader -> lab
-    cursor.execute("SELECT lab_id, lab_num FROM LABORATORIES WHERE rfid_reader_id = %s", [reader_id])
-    lab_row = cursor.fetchone()
+    lab_row = readers.lab_for(reader_id)
+    tap_timing.mark("reader")
     if not lab_row:
-        return JsonResponse({"error": "Unregistered RFID reader."}, status=404)
+        return {"error": "Unregistered RFID reader."}, 404
     lab_id, lab_num = lab_row
+    tap_timing.set_lab(lab_num)
 
-    LATE_MIN = 0  # set to 5 if you want exit grace
-
-    # Find an ACTIVE overlapping session
-    cursor.execute(f"""
-        SELECT TOP 1 utilization_id, date, start_time, end_time, requested_by
-          FROM UTILIZATION_SLIP
-         WHERE lab_id = %s
-           AND date   = %s
-           AND status = 'Active'
-           AND start_time <= %s
-           AND %s <= DATEADD(MINUTE, {LATE_MIN}, end_time)
-         ORDER BY start_time
-    """, [lab_id, today, current_time, current_time])
-    util = cursor.fetchone()
+    # Find an ACTIVE overlapping session (exit grace: timetable.STUDENT_LATE_MINUTES)
+    util = timetable.active_session(lab_id, today, current_time)
+    tap_timing.mark("schedule")
 
     if not util:
         # (keep your debug block if you had one)
-        return JsonResponse({
+        return {
             "error": "No active session in this lab.",
             "role": "student", "student": f"{sfname} {slname}", "lab": f"Lab {lab_num}",
-        }, status=403)
+        }, 403
 
     utilization_id, udate, ust, uet, req_by = util
 
@@ -4871,63 +5106,276 @@ def handle_student_rfid(cursor, student, reader_id, now, today, current_time):
                    SET time_out = %s
                  WHERE attendance_sheet_id = %s
             """, [current_time, attendance_id])
-            return JsonResponse({
+            _attendance_delta(lab_id, req_by, {
+                "utilization_id": utilization_id, "student": f"{sfname} {slname}",
+                "time_out": now.strftime("%H:%M:%S"),
+            })
+            return {
                 "status": "Student tap-out recorded.",
                 "role": "student", "student": f"{sfname} {slname}", "lab": f"Lab {lab_num}",
                 "time_out": now.strftime("%H:%M:%S")
-            })
+            }, 200
         else:
-            return JsonResponse({
+            return {
                 "status": "Already tapped out.",
                 "role": "student", "student": f"{sfname} {slname}", "lab": f"Lab {lab_num}"
-            })
+            }, 200
 
     # First tap → insert
     cursor.execute("""
         INSERT INTO COMPUTER_LAB_ATTENDANCE (student_id, utilization_id, time_in, remarks, created_at)
         VALUES (%s, %s, %s, %s, %s)
     """, [student_id, utilization_id, current_time, 'RFID tap-in', today])
+    _attendance_delta(lab_id, req_by, {
+        "utilization_id": utilization_id, "student": f"{sfname} {slname}",
+        "time_in": now.strftime("%H:%M:%S"),
+    })
 
-    return JsonResponse({
+    return {
         "status": "Student tap-in recorded.",
         "role": "student", "student": f"{sfname} {slname}", "lab": f"Lab {lab_num}",
         "time_in": now.strftime("%H:%M:%S")
-    })
+    }, 200
 
 
 # -------------------------------------------------
-# Active sessions (polled by frontend)
+# Batch check-in (readers flushing buffered taps)
 # -------------------------------------------------
+def _parse_tap_time(raw, server_now):
+    """Client timestamp (ISO 8601 or epoch seconds) as local time; None if implausible."""
+    if raw in (None, ""):
+        return server_now
+    try:
+        if isinstance(raw, (int, float)) or str(raw).replace(".", "", 1).isdigit():
+            when = dt.fromtimestamp(float(raw), tz=timezone.get_current_timezone())
+        else:
+            when = parse_datetime(str(raw))
+            if when is None:
+                return None
+            if timezone.is_naive(when):
+                when = timezone.make_aware(when)
+        when = timezone.localtime(when)
+    except (ValueError, OverflowError, OSError):
+        return None
+
+    age = (server_now - when).total_seconds()
+    max_age = float(getattr(settings, "RFID_BATCH_MAX_AGE_HOURS", 12)) * 3600
+    if age < -60 or age > max_age:
+        return None
+    return when
+
+
+def _student_taps_bulk(cursor, taps, results):
+    """
+    A run of student taps [(index, student, reader_id, when)], same rules as
+    _student_tap: sessions come from the timetable, one read for their
+    attendance, then one bulk INSERT and one bulk UPDATE. Fills results[index].
+    """
+    if not taps:
+        return
+
+    labs, matched, owners = {}, {}, {}  # owners: utilization_id -> requested_by
+    for i, _person, reader_id, when in taps:
+        lab_row = readers.lab_for(reader_id)
+        if not lab_row:
+            results[i] = ({"error": "Unregistered RFID reader."}, 404)
+            continue
+        labs[i] = lab_row
+        util = timetable.active_session(lab_row[0], when.date(), when.time())
+        if util:
+            matched[i] = util[0]
+            owners[util[0]] = util[4]
+
+    latest = {}  # (student_id, utilization_id) -> {"id", "time_out"} of the newest row
+    uids = sorted(set(matched.values()))
+    if uids:
+        cursor.execute(f"""
+            SELECT student_id, utilization_id, attendance_sheet_id, time_out
+              FROM COMPUTER_LAB_ATTENDANCE
+             WHERE utilization_id IN ({",".join(["%s"] * len(uids))})
+             ORDER BY attendance_sheet_id
+        """, uids)
+        for sid, uid, aid, tout in cursor.fetchall():
+            latest[(sid, uid)] = {"id": aid, "time_out": tout}
+
+    inserts, updates, deltas = {}, [], []
+    for i, person, _reader_id, when in taps:
+        if i not in labs:
+            continue
+        lab_id, lab_num = labs[i]
+        student_id, sfname, slname = person
+        who = {"role": "student", "student": f"{sfname} {slname}", "lab": f"Lab {lab_num}"}
+
+        uid = matched.get(i)
+        if uid is None:
+            results[i] = (dict({"error": "No active session in this lab."}, **who), 403)
+            continue
+
+        key, t, stamp = (student_id, uid), when.time(), when.strftime("%H:%M:%S")
+        rec = latest.get(key)
+        if rec is None:
+            latest[key] = {"id": None, "time_out": None}
+            inserts[key] = [student_id, uid, t, None, 'RFID tap-in', when.date()]
+            results[i] = (dict({"status": "Student tap-in recorded."}, **who, time_in=stamp), 200)
+            deltas.append((lab_id, owners.get(uid), {"utilization_id": uid, "student": who["student"], "time_in": stamp}))
+        elif rec["time_out"] is None:
+            rec["time_out"] = t
+            if rec["id"] is None:
+                inserts[key][3] = t  # tapped in and out inside this batch
+            else:
+                updates.append([t, rec["id"]])
+            results[i] = (dict({"status": "Student tap-out recorded."}, **who, time_out=stamp), 200)
+            deltas.append((lab_id, owners.get(uid), {"utilization_id": uid, "student": who["student"], "time_out": stamp}))
+        else:
+            results[i] = (dict({"status": "Already tapped out."}, **who), 200)
+
+    with transaction.atomic():
+        if inserts:
+            cursor.executemany("""
+                INSERT INTO COMPUTER_LAB_ATTENDANCE (student_id, utilization_id, time_in, time_out, remarks, created_at)
+                VALUES (%s, %s, %s, %s, %s, %s)
+            """, list(inserts.values()))
+        if updates:
+            cursor.executemany("""
+                UPDATE COMPUTER_LAB_ATTENDANCE
+                   SET time_out = %s
+                 WHERE attendance_sheet_id = %s AND time_out IS NULL
+            """, updates)
+        for lab_id, owner, delta in deltas:
+            _attendance_delta(lab_id, owner, delta)
+
+
 @csrf_exempt
-def get_active_sessions(request):
-    lab_id = request.GET.get("lab_id")
-    if not lab_id:
-        return JsonResponse({"active_sessions": []})
+def rfid_check_in_batch(request):
+    """
+    Buffered taps from readers, oldest first:
+        {"taps": [{"rfid_code": "...", "rfid_reader_id": "...", "ts": "2025-06-02T08:00:03"}, ...]}
+    ts is optional (ISO 8601 or epoch seconds; server time when missing).
+    Teacher taps run through the normal flow one at a time; the student taps
+    between them are applied in bulk. One result per tap, in the same order.
+    A card read again on the same reader within RFID_DEDUP_SECONDS (by ts)
+    repeats the first read's result; a resent batch with the same
+    Idempotency-Key header gets the first response back.
+    """
+    if request.method != "POST":
+        return JsonResponse({"error": "Invalid method."}, status=405)
 
-    now = timezone.localtime()
-    today = now.date()
-    now_t = now.time()
+    try:
+        body = json.loads(request.body or b"{}")
+    except ValueError:
+        return JsonResponse({"error": "Invalid JSON."}, status=400)
+    taps = body.get("taps") if isinstance(body, dict) else None
+    if not isinstance(taps, list) or not taps:
+        return JsonResponse({"error": "taps must be a non-empty list."}, status=400)
+    limit = int(getattr(settings, "RFID_BATCH_MAX", 200))
+    if len(taps) > limit:
+        return JsonResponse({"error": f"At most {limit} taps per batch."}, status=400)
+
+    idem_key = (request.headers.get("Idempotency-Key") or "").strip()
+    if idem_key:
+        body, replayed = tap_dedup.run(
+            ("batch", idem_key), lambda: _check_in_batch(taps), tap_dedup.idempotency_window())
+    else:
+        body, replayed = _check_in_batch(taps), False
+
+    response = JsonResponse(body)
+    if replayed:
+        response["X-Tap-Replayed"] = "1"
+    return response
+
+
+def _tap_field(tap, name):
+    """A tap's string field; readers may send card/reader ids as JSON numbers. None if not a scalar."""
+    value = tap.get(name)
+    if value is None:
+        return ""
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        return None
+    return str(value).strip()
+
+
+def _check_in_batch(taps):
+    server_now = timezone.localtime()
+    results = [None] * len(taps)
+    pending = []  # student taps since the last teacher tap
+    window = tap_dedup.tap_window()
+    last_read, repeats = {}, {}  # (code, reader) -> (index, when); repeat index -> first index
 
     with connection.cursor() as cursor:
-        # ✅ Keep sessions tidy on each poll
-        _complete_overdue_sessions(cursor, today, now_t)
+        for i, tap in enumerate(taps):
+            tap = tap if isinstance(tap, dict) else {}
+            reader_id = _tap_field(tap, "rfid_reader_id")
+            rfid_code = _tap_field(tap, "rfid_code")
+            if reader_id is None or rfid_code is None:
+                results[i] = ({"error": "rfid_code and rfid_reader_id must be strings."}, 400)
+                continue
+            readers.seen(reader_id)
+
+            when = _parse_tap_time(tap.get("ts"), server_now)
+            if when is None:
+                results[i] = ({"error": "Tap timestamp is invalid or out of range."}, 400)
+                continue
+
+            prev = last_read.get((rfid_code, reader_id))
+            if prev is not None and 0 <= (when - prev[1]).total_seconds() <= window:
+                repeats[i] = prev[0]
+                continue
+            last_read[(rfid_code, reader_id)] = (i, when)
+
+            kind, person = rfid_index.resolve(rfid_code)
+            if kind == "student":
+                pending.append((i, person, reader_id, when))
+            elif kind == "teacher":
+                # students before this tap must land first (e.g. before a tap-out)
+                _student_taps_bulk(cursor, pending, results)
+                pending = []
+                results[i] = _teacher_tap(cursor, person, reader_id, when, when.date(), when.time())
+            else:
+                results[i] = ({"error": "Unknown RFID code."}, 404)
+
+        _student_taps_bulk(cursor, pending, results)
+
+    for i, first in repeats.items():
+        payload, code = results[first]
+        results[i] = (dict(payload, duplicate_of=first), code)
+
+    return {
+        "results": [
+            dict(payload, index=i, http_status=code)
+            for i, (payload, code) in enumerate(results)
+        ]
+    }
+
+
+# -------------------------------------------------
+# Active sessions (polled by frontend)
+# -------------------------------------------------
+@require_GET
+def lab_live_stream(request, lab_id):
+    """SSE: active_sessions / attendance for one lab as they happen ("refresh" = re-fetch)."""
+    if not request.session.get('user_id'):
+        return JsonResponse({"error": "Unauthorized"}, status=403)
+    return live.response(request, f"lab-{lab_id}")
+
+
+def _active_sessions_etag(request):
+    return etags.lab_tag(request.GET.get("lab_id"), timezone.localdate())
 
-        cursor.execute("""
-            SELECT date, start_time, end_time, requested_by
-              FROM UTILIZATION_SLIP
-             WHERE lab_id = %s AND status = 'Active' AND date = %s
-        """, [lab_id, today])
-        rows = cursor.fetchall()
 
+@csrf_exempt
+@cache_control(private=True, no_cache=True)
+@etag(_active_sessions_etag)
+def get_active_sessions(request):
+    lab_id = request.GET.get("lab_id")
+    if not lab_id or not lab_id.isdigit():
+        return JsonResponse({"active_sessions": []})
+
+    # shared snapshot; sessions past their end wait for the sweeper but aren't shown
+    now_s = timezone.localtime().strftime("%H:%M:%S")
     return JsonResponse({
         "active_sessions": [
-            {
-                "date":       r[0].isoformat(),
-                "start_time": (r[1].strftime("%H:%M:%S") if r[1] else "00:00:00"),
-                "end_time":   (r[2].strftime("%H:%M:%S") if r[2] else "00:00:00"),
-                "faculty_id": r[3],
-            }
-            for r in rows
+            s for s in active_sessions.sessions(lab_id)
+            if s["end_time"] is None or s["end_time"] >= now_s
         ]
     })
 
@@ -5021,6 +5469,8 @@ def admin_profile(request):
                     email, password_hashed,
                     profile_image_path, admin_id
                 ])
+            attendance_previews.invalidate_all()
+            rfid_index.teacher_changed(admin_id)
 
             # ✅ set a one-time toast for the next GET render
             request.session["profile_toast"] = {
@@ -5076,13 +5526,8 @@ def manage_operating_time(request):
     context["current_page"] = "Operating Time"
 
  
-    try:
-        with connection.cursor() as c:
-            c.execute("SELECT 1 FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_NAME = 'OPERATING_TIME'")
-            if c.fetchone() is None:
-                return HttpResponseBadRequest("OPERATING_TIME table is missing. Please create it first.")
-    except Exception:
-        pass
+    if not _has_table("OPERATING_TIME"):
+        return HttpResponseBadRequest("OPERATING_TIME table is missing. Please create it first.")
 
     days_order = [
         (1, "Monday"),
@@ -5128,6 +5573,7 @@ def manage_operating_time(request):
                         INSERT INTO OPERATING_TIME (day_of_week, is_open, start_time, end_time)
                         VALUES (%s, %s, %s, %s)
                     """, [dow, is_open, start_val, end_val])
+        week_grid.hours_changed()
 
         messages.success(request, "Operating time updated.")
         return redirect("manage_operating_time")
@@ -5218,85 +5664,26 @@ def branding_settings(request):
   
     return render(request, "admin/branding_settings.html", {"form": form})
 
-def _push_active_sessions_for_lab(cursor, lab_id):
+def _push_active_sessions_for_lab(cursor, lab_id, teacher_id=None):
     """
     Re-query active sessions for this lab and push via Pusher.
     Frontend can subscribe to channel 'lab-<lab_id>' (optional).
+    teacher_id: whose slip changed, so their dashboard stream refreshes.
     """
-    cursor.execute("""
-        SELECT date, start_time, end_time, requested_by
-        FROM UTILIZATION_SLIP
-        WHERE lab_id = %s
-          AND status = 'Active'
-          AND date = %s
-    """, [lab_id, timezone.localdate()])
-    rows = cursor.fetchall()
-
-    payload = {
-        "active_sessions": [
-            {
-                "date":       r[0].isoformat(),
-                "start_time": r[1].strftime("%H:%M:%S") if r[1] else None,
-                "end_time":   r[2].strftime("%H:%M:%S") if r[2] else None,
-                "faculty_id": r[3],
-            }
-            for r in rows
-        ]
-    }
-
-    # Optional realtime channel for live highlighting
-    try:
-        realtime.trigger(f"lab-{lab_id}", "active_sessions", payload)
-    except Exception:
-        # Avoid breaking RFID flow if Pusher fails
-        pass
-def _complete_overdue_sessions(cursor, today, now_t):
-    """
-    Auto-complete any 'Active' sessions that should already be finished
-    (end_time < now). Also tap-out any remaining students and push
-    updated active_sessions for affected labs.
-    """
-    from datetime import datetime as dt
-
-    cursor.execute("""
-        SELECT utilization_id, lab_id, start_time, end_time
-        FROM UTILIZATION_SLIP
-        WHERE status = 'Active'
-          AND date   = %s
-          AND end_time < %s
-    """, [today, now_t])
-    rows = cursor.fetchall()
-
-    if not rows:
-        return
-
-    affected_labs = set()
-
-    for util_id, lab_id, st, et in rows:
-        affected_labs.add(lab_id)
-
-        if st and et:
-            duration = dt.combine(today, et) - dt.combine(today, st)
-            time_dur = (dt.min + duration).time()
-        else:
-            time_dur = None
-
-        # Mark slip completed
-        cursor.execute("""
-            UPDATE UTILIZATION_SLIP
-               SET status='Completed',
-                   time_duration=%s
-             WHERE utilization_id=%s
-        """, [time_dur, util_id])
-
-        # Auto tap-out students still inside
-        cursor.execute("""
-            UPDATE COMPUTER_LAB_ATTENDANCE
-               SET time_out = %s
-             WHERE utilization_id = %s
-               AND time_out IS NULL
-        """, [et or now_t, util_id])
-
-    # Push updated active_sessions for each affected lab
-    for lab_id in affected_labs:
-        _push_active_sessions_for_lab(cursor, lab_id)
+    tap_timing.mark("db")  # the slip write that led here
+    timetable.lab_changed(lab_id)  # every slip state change on a tap comes through here
+    payload = {"active_sessions": active_sessions.fresh(cursor, lab_id)}
+
+    # Optional realtime channel for live highlighting; queued in the realtime
+    # outbox and sent after commit, so the tap never waits on Pusher
+    realtime.publish(f"lab-{lab_id}", "active_sessions", payload)
+    if teacher_id:
+        live.publish_on_commit(f"teacher-{teacher_id}", "session", {"lab_id": lab_id})
+    tap_timing.mark("push")
+
+
+def _attendance_delta(lab_id, teacher_id, delta):
+    """A student tap, for the lab's and the session owner's live streams."""
+    live.publish_on_commit(f"lab-{lab_id}", "attendance", delta)
+    if teacher_id:
+        live.publish_on_commit(f"teacher-{teacher_id}", "attendance", delta)
@@ -1,9 +1,15 @@
 # teacher/realtime.py
+import logging
+import threading
+import time
+
 import pusher
 from django.conf import settings
-from django.db import connection
-from django.utils import timezone
-from datetime import time
+from django.db import transaction
+
+from core.utils import active_sessions, live
+
+log = logging.getLogger(__name__)
 
 
 class RealtimeService:
@@ -13,8 +19,15 @@ class RealtimeService:
         - teacher notifications
         - admin notifications
         - lab realtime (active sessions)
+
+    publish() is the outbox for state-style events (unread counts, a lab's
+    active sessions): the event is queued when the transaction commits,
+    only the latest data per (channel, event) is kept, and a background
+    dispatcher sends whatever is queued with Pusher's batch trigger.
     """
 
+    BATCH_SIZE = 10  # Pusher's limit per trigger_batch call
+
     def __init__(self):
         self.client = pusher.Pusher(
             app_id=settings.PUSHER_APP_ID,
@@ -23,6 +36,9 @@ class RealtimeService:
             cluster=settings.PUSHER_CLUSTER,
             ssl=True,
         )
+        self._outbox = {}                 # (channel, event) -> latest data
+        self._cond = threading.Condition()
+        self._dispatcher = None
 
     # -------------------------------------------------
     # BASIC EVENT TRIGGER
@@ -31,6 +47,60 @@ class RealtimeService:
         """Send ANY realtime event to ANY channel."""
         return self.client.trigger(channel, event, data)
 
+    # -------------------------------------------------
+    # OUTBOX (deferred, coalesced, batched)
+    # -------------------------------------------------
+    def publish(self, channel: str, event: str, data: dict):
+        """Queue an event for after commit; a newer one for the same channel/event replaces it."""
+        transaction.on_commit(lambda: self._enqueue(channel, event, data))
+
+    def _enqueue(self, channel, event, data):
+        live.publish(channel, event, data)  # open SSE streams in this process
+        with self._cond:
+            self._outbox[(channel, event)] = data
+            if self._dispatcher is None:
+                self._dispatcher = threading.Thread(target=self._dispatch_forever, name="realtime-outbox", daemon=True)
+                self._dispatcher.start()
+            self._cond.notify()
+
+    def _dispatch_forever(self):
+        linger = float(getattr(settings, "REALTIME_LINGER_MS", 50)) / 1000
+        backoff = 0
+        while True:
+            with self._cond:
+                while not self._outbox:
+                    self._cond.wait()
+            if linger:
+                time.sleep(linger)  # let a burst of taps collapse into one send
+            with self._cond:
+                pending, self._outbox = self._outbox, {}
+
+            failed = self._send(pending)
+            if not failed:
+                backoff = 0
+                continue
+            with self._cond:
+                for key, data in failed.items():
+                    self._outbox.setdefault(key, data)  # unless something newer arrived
+            backoff = min(30, (backoff or 0.5) * 2)
+            time.sleep(backoff)
+
+    def _send(self, pending):
+        """trigger_batch in chunks; returns the events that couldn't be sent."""
+        items = list(pending.items())
+        failed = {}
+        for start in range(0, len(items), self.BATCH_SIZE):
+            chunk = items[start:start + self.BATCH_SIZE]
+            try:
+                self.client.trigger_batch([
+                    {"channel": channel, "name": event, "data": data}
+                    for (channel, event), data in chunk
+                ])
+            except Exception as e:
+                log.warning("Pusher batch of %s event(s) failed: %s", len(chunk), e)
+                failed.update(chunk)
+        return failed
+
     # -------------------------------------------------
     # TEACHER NOTIFICATION
     # -------------------------------------------------
@@ -49,32 +119,10 @@ class RealtimeService:
     # LAB ACTIVE SESSIONS (both teacher + admin subscribe)
     # -------------------------------------------------
     def push_active_sessions(self, lab_id: int):
-        today = timezone.localdate()
-
-        with connection.cursor() as c:
-            c.execute("""
-                SELECT date, start_time, end_time, requested_by
-                FROM UTILIZATION_SLIP
-                WHERE lab_id = %s
-                  AND status = 'Active'
-                  AND date = %s
-            """, [lab_id, today])
-            rows = c.fetchall()
-
-        payload = {
-            "active_sessions": [
-                {
-                    "date": d.isoformat(),
-                    "start_time": (st or time(0, 0)).strftime("%H:%M:%S"),
-                    "end_time": (et or time(0, 0)).strftime("%H:%M:%S"),
-                    "faculty_id": fid,
-                }
-                for d, st, et, fid in rows
-            ]
-        }
+        payload = {"active_sessions": active_sessions.sessions(lab_id)}
 
         channel = f"lab-{lab_id}"
-        return self.trigger(channel, "active_sessions", payload)
+        return self.publish(channel, "active_sessions", payload)
 
 
 # GLOBAL instance importable everywhere
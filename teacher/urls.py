@@ -7,6 +7,7 @@ urlpatterns = [
 
     path('dashboard/', views.teacher_dashboard, name='teacher_dashboard'),
     path('dashboard-data/', views.teacher_dashboard_data, name='teacher_dashboard_data'),
+    path('live/', views.teacher_live_stream, name='teacher_live_stream'),
 
     path('profile/', views.teacher_profile, name='teacher_profile'),
 
@@ -12,17 +12,22 @@ from django.conf import settings
 from django.contrib import messages  # NOTE: correct messages import
 from django.contrib.auth.hashers import make_password
 from django.db import connection
-from django.http import HttpResponse, HttpResponseBadRequest, JsonResponse
+from django.http import FileResponse, HttpResponse, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
 from django.shortcuts import redirect, render
 from django.urls import reverse
 from django.views.decorators.csrf import csrf_exempt
 from django.core.mail import send_mail
 from django.utils import timezone
-from django.views.decorators.http import require_http_methods, require_POST, require_GET
+from django.views.decorators.http import require_http_methods, require_POST, require_GET, etag
+from django.views.decorators.cache import cache_control
 from django.db import transaction
 import requests
 
 from .realtime import realtime
+from core.utils.ssrs import report_jobs, iter_render, fetch_pdf
+from core.utils.exports import primed, zip_stream, merge_pdfs, too_many_to_merge, zip_download
+from core.utils.report_cache import slip_versions, get_or_render
+from core.utils import active_sessions, etags, live, local_reports, rfid_index, schema, timetable, week_grid
 
 
 # ---------------------------
@@ -141,7 +146,14 @@ def _make_auth_headers_and_authobj():
     else:
         return ({}, None)
 
-def _ssrs_pdf(report_path, params, timeout=60):
+def _ssrs_pdf(report_path, params, timeout=None):
+    """Report PDF from SSRS or the local renderer, per REPORT_RENDERERS."""
+    return local_reports.render_pdf(
+        report_path, params,
+        lambda: _ssrs_fetch(report_path, params, timeout)
+    )
+
+def _ssrs_fetch(report_path, params, timeout=None):
     base = settings.SSRS_BASE_URL.rstrip('/')
     qp = [("rs:Command", "Render"), ("rs:Format", "PDF")]
     for k, v in params.items():
@@ -152,29 +164,18 @@ def _ssrs_pdf(report_path, params, timeout=60):
         for k, v in qp
     )
     url = f"{base}?{requests.utils.quote(report_path, safe='/')}&{query}"
+    return fetch_pdf(url, report_path, _make_auth_headers_and_authobj, timeout)
 
-    headers, auth = _make_auth_headers_and_authobj()
-    last = None
-    for _ in (1, 2):  # one retry on 5xx
-        try:
-            r = requests.get(
-                url, auth=auth, headers=headers,
-                verify=getattr(settings, "SSRS_VERIFY_TLS", False),
-                timeout=timeout
-            )
-        except requests.RequestException as ex:
-            raise requests.HTTPError(f"SSRS request failed for {url}\n{ex}") from ex
-
-        if r.status_code == 200:
-            return r.content
-
-        last = r
-        print("SSRS status:", r.status_code, r.reason)
-        print("SSRS body:", r.text[:1500])
-        if r.status_code < 500:
-            break
 
-    raise requests.HTTPError(f"{last.status_code} {last.reason} for {url}\n\n{last.text[:4000]}")
+def _report_pdf(report_path, param_name, uid, versions=None):
+    """_ssrs_pdf for one slip, served from the on-disk cache once it's Completed."""
+    uid_int = _int_or_none(uid)
+    if versions is None:
+        versions = slip_versions([uid_int]) if uid_int is not None else {}
+    return get_or_render(
+        report_path, uid_int, versions.get(uid_int),
+        lambda: _ssrs_pdf(report_path, {param_name: uid})
+    )
 
 
 # =========================
@@ -503,24 +504,16 @@ def teacher_print_queue(request):
     if not ids:
         return HttpResponse("No records to print for the selected filters.", status=404)
 
-    merger = PdfMerger()
+    jobs = report_jobs(ids, t)
     try:
-        for uid in ids:
-            if t in ("both", "utilization"):
-                merger.append(io.BytesIO(_ssrs_pdf(
-                    settings.SSRS_UTILIZATION_REPORT_PATH,
-                    {settings.SSRS_UTIL_PARAM_NAME: uid}
-                )))
-            if t in ("both", "attendance"):
-                merger.append(io.BytesIO(_ssrs_pdf(
-                    settings.SSRS_ATTENDANCE_REPORT_PATH,
-                    {settings.SSRS_ATTEND_PARAM_NAME: uid}
-                )))
+        pdfs = iter_render(jobs, _ssrs_pdf, slip_versions(ids))
+        if too_many_to_merge(jobs):
+            return zip_download(jobs, primed(pdfs), f"teacher_print_queue_{t}.zip")
+        merged = merge_pdfs(pdfs)
     except requests.HTTPError as e:
         return HttpResponse(f"SSRS error: {e}", status=502)
 
-    out = io.BytesIO(); merger.write(out); merger.close()
-    resp = HttpResponse(out.getvalue(), content_type="application/pdf")
+    resp = FileResponse(merged, content_type="application/pdf")
     resp['Content-Disposition'] = 'inline; filename=teacher_print_queue.pdf'
     return resp
 
@@ -539,29 +532,19 @@ def teacher_export_merged_pdf(request):
     if not ids:
         return HttpResponse("No records to export for the selected filters.", status=404)
 
-    merger = PdfMerger()
+    # dt is datetime class: from datetime import datetime as dt
+    stamp = dt.now().strftime('%Y%m%d_%H%M%S')
+    jobs = report_jobs(ids, t)
     try:
-        for uid in ids:
-            if t in ("both", "utilization"):
-                merger.append(io.BytesIO(_ssrs_pdf(
-                    settings.SSRS_UTILIZATION_REPORT_PATH,
-                    {settings.SSRS_UTIL_PARAM_NAME: uid}
-                )))
-            if t in ("both", "attendance"):
-                merger.append(io.BytesIO(_ssrs_pdf(
-                    settings.SSRS_ATTENDANCE_REPORT_PATH,
-                    {settings.SSRS_ATTEND_PARAM_NAME: uid}
-                )))
+        pdfs = iter_render(jobs, _ssrs_pdf, slip_versions(ids))
+        if too_many_to_merge(jobs):
+            return zip_download(jobs, primed(pdfs), f"attendance_export_{t}_{stamp}.zip")
+        merged = merge_pdfs(pdfs)
     except requests.HTTPError as e:
         return HttpResponse(f"SSRS error: {e}", status=502)
 
-    out = io.BytesIO()
-    merger.write(out)
-    merger.close()
-
-    # dt is datetime class: from datetime import datetime as dt
-    filename = f"attendance_export_{t}_{dt.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-    resp = HttpResponse(out.getvalue(), content_type="application/pdf")
+    filename = f"attendance_export_{t}_{stamp}.pdf"
+    resp = FileResponse(merged, content_type="application/pdf")
     resp['Content-Disposition'] = f'attachment; filename="{filename}"'
     return resp
 
@@ -582,23 +565,14 @@ def teacher_export_zip(request):
     if not ids:
         return HttpResponse("No records to export for the selected filters.", status=404)
 
-    buf = io.BytesIO()
+    jobs = report_jobs(ids, t)
     try:
-        with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
-            for uid in ids:
-                if t in ("both", "utilization"):
-                    zf.writestr(f"UtilizationSlip_{uid}.pdf",
-                                _ssrs_pdf(settings.SSRS_UTILIZATION_REPORT_PATH,
-                                          {settings.SSRS_UTIL_PARAM_NAME: uid}))
-                if t in ("both", "attendance"):
-                    zf.writestr(f"AttendanceSheet_{uid}.pdf",
-                                _ssrs_pdf(settings.SSRS_ATTENDANCE_REPORT_PATH,
-                                          {settings.SSRS_ATTEND_PARAM_NAME: uid}))
+        pdfs = primed(iter_render(jobs, _ssrs_pdf, slip_versions(ids)))
     except requests.HTTPError as e:
         return HttpResponse(f"SSRS error: {e}", status=502)
 
-    ts = dt.datetime.now().strftime("%Y%m%d_%H%M%S")
-    resp = HttpResponse(buf.getvalue(), content_type="application/zip")
+    ts = dt.now().strftime("%Y%m%d_%H%M%S")
+    resp = StreamingHttpResponse(zip_stream(jobs, pdfs), content_type="application/zip")
     resp['Content-Disposition'] = f'attachment; filename=teacher_exports_{t}_{ts}.zip'
     return resp
 
@@ -622,9 +596,9 @@ def teacher_print_utilization_slip(request, utilization_id):
             return HttpResponse("Unauthorized or not found.", status=403)
 
     try:
-        pdf = _ssrs_pdf(
+        pdf = _report_pdf(
             settings.SSRS_UTILIZATION_REPORT_PATH,
-            {settings.SSRS_UTIL_PARAM_NAME: utilization_id}
+            settings.SSRS_UTIL_PARAM_NAME, utilization_id
         )
     except requests.HTTPError as e:
         return HttpResponse(f"SSRS error: {e}", status=502)
@@ -649,9 +623,9 @@ def teacher_print_attendance_sheet(request, utilization_id):
             return HttpResponse("Unauthorized or not found.", status=403)
 
     try:
-        pdf = _ssrs_pdf(
+        pdf = _report_pdf(
             settings.SSRS_ATTENDANCE_REPORT_PATH,
-            {settings.SSRS_ATTEND_PARAM_NAME: utilization_id}
+            settings.SSRS_ATTEND_PARAM_NAME, utilization_id
         )
     except requests.HTTPError as e:
         return HttpResponse(f"SSRS error: {e}", status=502)
@@ -678,19 +652,21 @@ def teacher_print_both_ssrs(request, utilization_id):
         if not cursor.fetchone():
             return HttpResponse("Unauthorized or not found.", status=403)
 
+    versions = slip_versions([utilization_id])
+
     merger = PdfMerger()
     try:
         # Utilization slip
-        util_pdf = _ssrs_pdf(
+        util_pdf = _report_pdf(
             settings.SSRS_UTILIZATION_REPORT_PATH,
-            {settings.SSRS_UTIL_PARAM_NAME: utilization_id}
+            settings.SSRS_UTIL_PARAM_NAME, utilization_id, versions
         )
         merger.append(io.BytesIO(util_pdf))
 
         # Attendance sheet
-        att_pdf = _ssrs_pdf(
+        att_pdf = _report_pdf(
             settings.SSRS_ATTENDANCE_REPORT_PATH,
-            {settings.SSRS_ATTEND_PARAM_NAME: utilization_id}
+            settings.SSRS_ATTEND_PARAM_NAME, utilization_id, versions
         )
         merger.append(io.BytesIO(att_pdf))
 
@@ -758,10 +734,18 @@ def teacher_dashboard(request):
             "end": active_session[3].strftime("%H:%M") if active_session and active_session[3] else "—",
         } if active_session else None),
         "current_page": "Dashboard",
+        "live_enabled": live.enabled(),
+        "safety_poll_ms": int(getattr(settings, "SSE_SAFETY_POLL_SECONDS", 60)) * 1000,
     })
     return render(request, "teacher/teacher_dashboard.html", context)
 
 
+def _dashboard_data_etag(request):
+    return etags.teacher_tag(request.session.get("user_id"), timezone.localdate())
+
+
+@cache_control(private=True, no_cache=True)
+@etag(_dashboard_data_etag)
 def teacher_dashboard_data(request):
     teacher_id = request.session.get("user_id")
     if not teacher_id:
@@ -842,6 +826,15 @@ def teacher_dashboard_data(request):
     return JsonResponse(data)
 
 
+@require_GET
+def teacher_live_stream(request):
+    """SSE for the dashboard: "session" when this teacher's slip changes, "attendance" per student tap."""
+    teacher_id = request.session.get("user_id")
+    if not teacher_id:
+        return JsonResponse({"error": "Unauthorized"}, status=403)
+    return live.response(request, f"teacher-{teacher_id}")
+
+
 # ---------------------------
 # Schedule helpers
 # ---------------------------
@@ -1187,6 +1180,9 @@ def create_schedule(request):
             ])
             created_count += 1
             current_date += timedelta(days=1)
+    if created_count:
+        timetable.lab_changed(lab_id)
+        week_grid.changed(lab_id, start_date, end_date)
 
     # ---------- finalize ----------
     if created_count == 0:
@@ -1308,6 +1304,8 @@ def update_schedule_section(request):
                 [schedule_id],
             )
             rows_affected = cur.rowcount
+            timetable.changed_all()
+            week_grid.changed_all()
 
             cur.execute(
                 "SELECT status, ISNULL(student_year_and_section,'') FROM LAB_SCHEDULE WHERE schedule_id = %s",
@@ -1379,6 +1377,8 @@ def update_schedule_section(request):
             )
 
         rows_affected = cur.rowcount
+        timetable.changed_all()
+        week_grid.changed_all()
 
         cur.execute(
             "SELECT status, ISNULL(student_year_and_section,'') FROM LAB_SCHEDULE WHERE schedule_id = %s",
@@ -1914,10 +1914,20 @@ def view_lab_availability(request):
         "user_shortname": user_shortname,
         "today": today,
         "own_request_ranges_json": own_request_ranges_json,
+        "live_enabled": live.enabled(),
+        "safety_poll_ms": int(getattr(settings, "SSE_SAFETY_POLL_SECONDS", 60)) * 1000,
     })
     return render(request, "teacher/view_lab_availability.html", context)
 
 # ---------- AJAX: weekly preview (uses AM/PM) ----------
+def _lab_week_etag(request):
+    g = request.GET
+    mine_for = request.session.get("user_id") if (g.get("mine") == "1" and request.session.get("role") == "teacher") else None
+    return etags.week_tag(g.get("lab_id"), g.get("week"), date.today(), g.get("include_requests") == "1", mine_for)
+
+
+@cache_control(private=True, no_cache=True)
+@etag(_lab_week_etag)
 def lab_week_data(request):
     if request.method != "GET":
         return JsonResponse({"error": "GET only"}, status=405)
@@ -1927,7 +1937,7 @@ def lab_week_data(request):
     include_requests = (request.GET.get("include_requests") == "1")
     mine_param = request.GET.get("mine")  # "1" when called from My Schedule
 
-    if not lab_id:
+    if not lab_id or not lab_id.isdigit():
         return JsonResponse({"error": "lab_id required"}, status=400)
 
     try:
@@ -1935,14 +1945,24 @@ def lab_week_data(request):
     except ValueError:
         base_date = date.today()
 
+    role = request.session.get("role")
+    teacher_id = request.session.get("user_id") if role == "teacher" else None
+    mine_for = teacher_id if (mine_param == "1" and teacher_id) else None
+
+    # same lab/week/filters -> same grid; served from the week-grid cache
+    return JsonResponse(week_grid.get_or_build(
+        "lab", lab_id, base_date, include_requests, mine_for,
+        lambda: _lab_week_payload(lab_id, base_date, include_requests, mine_for)))
+
+
+def _lab_week_payload(lab_id, base_date, include_requests, teacher_id=None):
+    """Week grid for one lab; teacher_id = only that teacher's rows (My Schedule)."""
+    mine = teacher_id is not None
+
     start_of_week = base_date - timedelta(days=base_date.weekday())  # Monday
     end_of_week   = start_of_week + timedelta(days=6)                # Sunday
     week_range_display = f"{start_of_week.strftime('%b %d')} - {end_of_week.strftime('%d, %Y')}"
 
-    role = request.session.get("role")
-    teacher_id = request.session.get("user_id") if role == "teacher" else None
-    mine = (mine_param == "1" and role == "teacher")
-
     entries = defaultdict(lambda: defaultdict(list))
     req_entries = defaultdict(lambda: defaultdict(list))
     time_set = set()
@@ -2065,44 +2085,28 @@ def lab_week_data(request):
 
     time_slots = sorted(time_set)
 
-    return JsonResponse({
+    return {
         "week_range": week_range_display,
         "entries": {d: dict(times) for d, times in entries.items()},
         "req_entries": {d: dict(times) for d, times in req_entries.items()} if include_requests else {},
         "time_slots": time_slots
-    })
+    }
 
 # ---------- POLLING: active sessions for highlighting ----------
 # ---------- POLLING: active sessions for highlighting ----------
+def _active_sessions_etag(request):
+    return etags.lab_tag(request.GET.get("lab_id"), timezone.localdate())
+
+
+@cache_control(private=True, no_cache=True)
+@etag(_active_sessions_etag)
 def get_active_sessions(request):
     lab_id = request.GET.get("lab_id")
-    now = timezone.localtime()
-    today = now.date()
-    now_t = now.time()
-
-    if not lab_id:
+    if not lab_id or not lab_id.isdigit():
         return JsonResponse({"active_sessions": []})
 
-    with connection.cursor() as cursor:
-        cursor.execute("""
-            SELECT u.date, u.start_time, u.end_time, u.requested_by, u.schedule_id
-            FROM UTILIZATION_SLIP u
-            WHERE u.lab_id = %s
-              AND u.status = 'Active'
-        """, [lab_id])
-        rows = cursor.fetchall()
-
-    active = []
-    for d, st, et, faculty_id, schedule_id in rows:
-        active.append({
-            "date": d.isoformat(),
-            "start_time": st.strftime("%H:%M:%S") if st else None,
-            "end_time": et.strftime("%H:%M:%S") if et else None,
-            "faculty_id": faculty_id,
-            "schedule_id": schedule_id,
-        })
-
-    return JsonResponse({"active_sessions": active})
+    # today's Active slips from the shared snapshot (older ones are the sweeper's)
+    return JsonResponse({"active_sessions": active_sessions.sessions(lab_id)})
 
 
 
@@ -2312,6 +2316,8 @@ def submit_utilization_request(request):
                     start_dt.time(), end_dt.time(), year_section, op_id
                 ])
                 schedule_id = cursor.fetchone()[0]
+                timetable.lab_changed(lab_id)
+                week_grid.changed(lab_id, date_value)
                 
                 # Convert pending if present, else insert Approved (with op FK)
                 cursor.execute("""
@@ -2463,6 +2469,8 @@ def submit_utilization_request(request):
                     teacher_id, year_section, remarks,
                     lab_id, assigned_teacher_id, op_id
                 ])
+                timetable.lab_changed(lab_id)
+                week_grid.changed(lab_id, date_value)
             
             # ---------- Notifications & Emails (New Pending) ----------
             lab_num, lab_in_charge = _get_in_charge(lab_id)
@@ -2683,6 +2691,7 @@ def approve_reservation(request, res_id):
 
                 if cursor.rowcount == 0:
                     return _redirect_pending(lab_id, "info", "Status changed by someone else. Refreshed list shown.")
+                week_grid.changed(lab_id, date_val)
 
                 _notify_faculty(
                     requested_by, teacher_id,
@@ -2700,6 +2709,8 @@ def approve_reservation(request, res_id):
                            student_year_and_section = %s
                      WHERE schedule_id = %s
                 """, [req_assigned_teacher_id, requested_by, year_section, schedule_id])
+                timetable.lab_changed(lab_id)
+                week_grid.changed(lab_id, date_val)
 
                 cursor.execute("""
                     UPDATE UTILIZATION_SLIP
@@ -2765,6 +2776,8 @@ def approve_reservation(request, res_id):
                            student_year_and_section = %s
                      WHERE schedule_id = %s
                 """, [start_time_obj, end_time_obj, req_assigned_teacher_id, requested_by, year_section, ov_schedule_id])
+                timetable.lab_changed(lab_id)
+                week_grid.changed(lab_id, date_val)
 
                 cursor.execute("""
                     UPDATE UTILIZATION_SLIP
@@ -2822,6 +2835,8 @@ def approve_reservation(request, res_id):
             VALUES (%s, %s, %s, %s, %s, %s, %s, 'Scheduled')
         """, [lab_id, req_assigned_teacher_id, requested_by, date_val, start_time_obj, end_time_obj, year_section])
         schedule_id = cursor.fetchone()[0]
+        timetable.lab_changed(lab_id)
+        week_grid.changed(lab_id, date_val)
 
         cursor.execute("""
             UPDATE UTILIZATION_SLIP
@@ -2893,6 +2908,8 @@ def reject_reservation(request, res_id):
 
         if cursor.rowcount == 0:
             return _redirect_pending(lab_id, "info", "Status changed by someone else. Refreshed list shown.")
+        timetable.lab_changed(lab_id)
+        week_grid.changed(lab_id, date_val)
 
         # Notify requester
         cursor.execute("SELECT lab_num FROM LABORATORIES WHERE lab_id = %s", [lab_id])
@@ -3064,6 +3081,7 @@ def teacher_profile(request):
                 email, new_password,
                 profile_image_path, teacher_id
             ])
+        rfid_index.teacher_changed(teacher_id)
 
         return redirect("teacher_profile")
 
@@ -3087,11 +3105,14 @@ def teacher_profile(request):
 # ---------------------------
 
 def _ensure_is_active_column():
+    if schema.has_column("ASSIGNED_TEACHER", "is_active"):
+        return
     with connection.cursor() as c:
         c.execute("""
         IF COL_LENGTH('ASSIGNED_TEACHER','is_active') IS NULL
            ALTER TABLE ASSIGNED_TEACHER ADD is_active BIT NOT NULL DEFAULT 1
         """)
+    schema.refresh()
 
 def _has_active_session_now(assigned_teacher_id: int) -> bool:
     with connection.cursor() as c:
@@ -3122,6 +3143,8 @@ def _has_active_session_now(assigned_teacher_id: int) -> bool:
         return us_now > 0
 
 def _cancel_upcoming_rows(assigned_teacher_id: int):
+    timetable.changed_all()
+    week_grid.changed_all()
     with connection.cursor() as c:
         # 1) LAB_SCHEDULE: cancel upcoming, skip Cancelled/Rejected/Completed
         c.execute("""
@@ -3412,10 +3435,7 @@ def _push_unread_to_channel(faculty_id: int):
 
     channel = f"{role}-{faculty_id}"  # matches pusher.js subscriptions
 
-    try:
-        realtime.trigger(channel, "notification", {
-            "unread_count": unread,
-        })
-    except Exception as e:
-        # Don't break the main flow if Pusher fails
-        print("Pusher error while pushing unread count:", e)
\ No newline at end of file
+    # sent after commit by the realtime outbox; never blocks this request
+    realtime.publish(channel, "notification", {
+        "unread_count": unread,
+    })
\ No newline at end of file